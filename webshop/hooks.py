@@ -43,12 +43,68 @@ doc_events = {
         "on_update": [
             "webshop.webshop.crud_events.item.update_website_item.execute",
             "webshop.webshop.crud_events.item.invalidate_item_variants_cache.execute",
+            "webshop.webshop.crud_events.item.update_attribute_index.execute",
+            "webshop.webshop.crud_events.item.update_search_index.execute",
+            "webshop.webshop.product_data_engine.filters.clear_product_filters_cache",
         ],
         "before_rename": [
             "webshop.webshop.crud_events.item.validate_duplicate_website_item.execute",
         ],
         "after_rename": [
             "webshop.webshop.crud_events.item.invalidate_item_variants_cache.execute",
+            "webshop.webshop.crud_events.item.update_attribute_index.execute",
+        ],
+        "after_delete": [
+            "webshop.webshop.crud_events.item.update_attribute_index.execute",
+        ],
+    },
+    "Item Attribute": {
+        "on_update": [
+            "webshop.webshop.variant_selector.item_variants_cache.clear_item_attribute_values",
+        ],
+        "after_rename": [
+            "webshop.webshop.variant_selector.item_variants_cache.clear_item_attribute_values",
+        ],
+        "on_trash": [
+            "webshop.webshop.variant_selector.item_variants_cache.clear_item_attribute_values",
+        ],
+    },
+    "Bin": {
+        "on_update": [
+            "webshop.webshop.utils.product.clear_stock_qty_cache",
+        ],
+    },
+    "Stock Ledger Entry": {
+        "on_submit": [
+            "webshop.webshop.utils.product.clear_stock_qty_cache",
+            "webshop.webshop.utils.product.refresh_item_expired_batch_qty",
+        ],
+    },
+    "Batch": {
+        "on_update": [
+            "webshop.webshop.utils.product.refresh_item_expired_batch_qty",
+        ],
+    },
+    "Warehouse": {
+        "on_update": [
+            "webshop.webshop.utils.warehouse.clear_warehouse_tree",
+        ],
+        "after_rename": [
+            "webshop.webshop.utils.warehouse.clear_warehouse_tree",
+        ],
+        "on_trash": [
+            "webshop.webshop.utils.warehouse.clear_warehouse_tree",
+        ],
+    },
+    "Product Bundle": {
+        "on_update": [
+            "webshop.webshop.utils.product.clear_product_bundle_items",
+        ],
+        "after_rename": [
+            "webshop.webshop.utils.product.clear_product_bundle_items",
+        ],
+        "on_trash": [
+            "webshop.webshop.utils.product.clear_product_bundle_items",
         ],
     },
     "Sales Taxes and Charges Template": {
@@ -71,4 +127,46 @@ doc_events = {
             "webshop.webshop.crud_events.tax_rule.validate_use_for_cart.execute",
         ],
     },
+    "Brand": {
+        "on_update": [
+            "webshop.webshop.product_data_engine.filters.clear_product_filters_cache",
+        ],
+        "after_rename": [
+            "webshop.webshop.crud_events.brand.update_search_index.execute",
+        ],
+        "on_trash": [
+            "webshop.webshop.product_data_engine.filters.clear_product_filters_cache",
+        ],
+    },
+    "Item Price": {
+        "on_update": [
+            "webshop.webshop.crud_events.item_price.refresh_website_item_discounts.execute",
+        ],
+        "on_trash": [
+            "webshop.webshop.crud_events.item_price.refresh_website_item_discounts.execute",
+        ],
+    },
+    "Pricing Rule": {
+        "on_update": [
+            "webshop.webshop.crud_events.pricing_rule.refresh_website_item_discounts.execute",
+        ],
+        "on_trash": [
+            "webshop.webshop.crud_events.pricing_rule.refresh_website_item_discounts.execute",
+        ],
+    },
+}
+
+scheduler_events = {
+    "all": [
+        # in case a queued sync job was missed
+        "webshop.webshop.redisearch_utils.sync_index_queue",
+    ],
+    "hourly": [
+        "webshop.webshop.doctype.website_item_discount.website_item_discount.refresh_website_item_discounts",
+    ],
+    "daily": [
+        "webshop.webshop.product_data_engine.attribute_index.clear_attribute_index",
+        "webshop.webshop.redisearch_utils.define_autocomplete_dictionary",
+        "webshop.webshop.utils.product.refresh_expired_batch_qty",
+    ],
 }
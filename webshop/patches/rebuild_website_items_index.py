@@ -0,0 +1,20 @@
+import frappe
+
+from webshop.webshop.redisearch_utils import is_redisearch_enabled
+
+
+def execute():
+	"""
+	Rebuild the search index to pick up schema changes (numeric sortable ranking, typed
+	fields, computed item group and attribute fields).
+	Bump the date in patches.txt to run it again on later schema changes.
+	"""
+	if not is_redisearch_enabled():
+		return
+
+	frappe.enqueue(
+		"webshop.webshop.redisearch_utils.create_website_items_index",
+		queue="long",
+		job_id="create_website_items_index",
+		deduplicate=True,
+	)
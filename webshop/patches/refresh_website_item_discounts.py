@@ -0,0 +1,14 @@
+import frappe
+
+
+def execute():
+	"""
+	Fill the Website Item Discount table that product listings filter discounts by.
+	The hourly job keeps it up to date afterwards.
+	"""
+	frappe.enqueue(
+		"webshop.webshop.doctype.website_item_discount.website_item_discount.refresh_website_item_discounts",
+		queue="long",
+		job_id="refresh_website_item_discounts",
+		deduplicate=True,
+	)
@@ -10,14 +10,20 @@ from redis.commands.search.query import Query
 from webshop.webshop.redisearch_utils import (
 	WEBSITE_ITEM_CATEGORY_AUTOCOMPLETE,
 	WEBSITE_ITEM_INDEX,
-	WEBSITE_ITEM_NAME_AUTOCOMPLETE,
+	is_ranking_sortable,
 	is_redisearch_enabled,
 )
+from webshop.webshop.doctype.website_item.website_item import (
+	get_search_fulltext_condition,
+	get_search_fulltext_query,
+)
 from webshop.webshop.shopping_cart.product_info import set_product_info_for_website
 from webshop.webshop.doctype.override_doctype.item_group import get_item_for_list_in_html
 
 no_cache = 1
 
+SEARCH_RESULT_FIELDS = ("name", "web_item_name", "route", "thumbnail", "ranking")
+
 
 def get_context(context):
 	context.show_search = True
@@ -46,8 +52,16 @@ def get_product_data(search=None, start=0, limit=12):
 		WHERE published = 1
 		"""
 
+	order_by = "ranking desc, modified desc"
+
 	# search term condition
-	if search:
+	fulltext_search = get_search_fulltext_query(search) if search else None
+	if fulltext_search:
+		# most relevant first
+		query += " and " + get_search_fulltext_condition()
+		order_by = get_search_fulltext_condition() + " desc, " + order_by
+		search = fulltext_search
+	elif search:
 		query += """ and (item_name like %(search)s
 				or web_item_name like %(search)s
 				or brand like %(search)s
@@ -55,7 +69,8 @@ def get_product_data(search=None, start=0, limit=12):
 		search = "%" + cstr(search) + "%"
 
 	# order by
-	query += """ ORDER BY ranking desc, modified desc limit %s offset %s""" % (
+	query += """ ORDER BY %s limit %s offset %s""" % (
+		order_by,
 		cint(limit),
 		cint(start),
 	)
@@ -75,13 +90,13 @@ def search(query):
 
 
 @frappe.whitelist(allow_guest=True)
-def product_search(query, limit=10, fuzzy_search=True):
+def product_search(query, limit=10, fuzzy_search=True, start=0):
 	search_results = {"from_redisearch": True, "results": []}
 
 	if not is_redisearch_enabled():
 		# Redisearch module not enabled
 		search_results["from_redisearch"] = False
-		search_results["results"] = get_product_data(query, 0, limit)
+		search_results["results"] = get_product_data(query, start, limit)
 		return search_results
 
 	if not query:
@@ -89,34 +104,46 @@ def product_search(query, limit=10, fuzzy_search=True):
 
 	redis = frappe.cache()
 	query = clean_up_query(query)
+	if not query.strip():
+		return search_results
 
-	# TODO: Check perf/correctness with Suggestions & Query vs only Query
-	# TODO: Use Levenshtein Distance in Query (max=3)
 	redisearch = redis.ft(WEBSITE_ITEM_INDEX)
-	suggestions = redisearch.sugget(
-		WEBSITE_ITEM_NAME_AUTOCOMPLETE,
-		query,
-		num=limit,
-		fuzzy=fuzzy_search and len(query) > 3,
-	)
-
-	# Build a query
-	query_string = query
 
-	for s in suggestions:
-		query_string += f"|('{clean_up_query(s.string)}')"
+	# one round trip: matching, ranking order and paging are done by redisearch
+	q = (
+		Query(build_search_query(query, fuzzy_search=cint(fuzzy_search)))
+		.paging(cint(start), cint(limit))
+		.return_fields(*SEARCH_RESULT_FIELDS)
+	)
+	if is_ranking_sortable():
+		# else ordered by relevance until the index is rebuilt
+		q.sort_by("ranking", asc=False)
 
-	q = Query(query_string)
 	results = redisearch.search(q)
 
 	search_results["results"] = list(map(convert_to_dict, results.docs))
-	search_results["results"] = sorted(
-		search_results["results"], key=lambda k: frappe.utils.cint(k["ranking"]), reverse=True
-	)
+	search_results["total"] = results.total
 
 	return search_results
 
 
+def build_search_query(query, fuzzy_search=True):
+	"""
+	Build a query that matches words as prefixes (like the name autocompleter did)
+	or, with fuzzy search, within a Levenshtein distance of 1 for longer words.
+	"""
+	words = query.split()
+
+	# redisearch needs at least 2 characters for a prefix query
+	query_string = "({0})".format(" ".join(f"{w}*" if len(w) > 1 else w for w in words))
+
+	if fuzzy_search and any(len(w) > 3 for w in words):
+		fuzzy_query = " ".join(f"%{w}%" if len(w) > 3 else w for w in words)
+		query_string += f"|({fuzzy_query})"
+
+	return query_string
+
+
 def clean_up_query(query):
 	return "".join(c for c in query if c.isalnum() or c.isspace())
 
@@ -8,6 +8,7 @@ from webshop.webshop.doctype.webshop_settings.webshop_settings import (
 from webshop.webshop.shopping_cart.cart import _set_price_list
 from erpnext.utilities.product import get_price
 from webshop.webshop.shopping_cart.cart import get_party
+from webshop.webshop.utils.product import get_items_stock_availability
 
 
 def get_context(context):
@@ -26,20 +27,7 @@ def get_context(context):
 
 
 def get_stock_availability(item_code, warehouse):
-	from erpnext.stock.doctype.warehouse.warehouse import get_child_warehouses
-
-	if warehouse and frappe.get_cached_value("Warehouse", warehouse, "is_group") == 1:
-		warehouses = get_child_warehouses(warehouse)
-	else:
-		warehouses = [warehouse] if warehouse else []
-
-	stock_qty = 0.0
-	for warehouse in warehouses:
-		stock_qty += frappe.utils.flt(
-			frappe.db.get_value("Bin", {"item_code": item_code, "warehouse": warehouse}, "actual_qty")
-		)
-
-	return bool(stock_qty)
+	return get_items_stock_availability({item_code: warehouse}).get(item_code, False)
 
 
 def get_wishlist_items():
@@ -63,11 +51,15 @@ def get_wishlist_items():
 
 
 def set_stock_price_details(items, settings, selling_price_list):
+	availability = {}
+	if settings.show_stock_availability:
+		availability = get_items_stock_availability(
+			{item.item_code: item.get("warehouse") for item in items}
+		)
+
 	for item in items:
 		if settings.show_stock_availability:
-			item.available = get_stock_availability(
-				item.item_code, item.get("warehouse")
-			)
+			item.available = availability.get(item.item_code, False)
 
 		party = get_party()
 
@@ -27,6 +27,7 @@ def get_product_filter_data(query_args=None):
 		start (int): Offset items by
 		item_group (str): Valid Item Group
 		from_filters (bool): Set as True to jump to page 1
+		with_facet_counts (bool): Set as True to get item counts per filter value
 	"""
 	if isinstance(query_args, str):
 		query_args = json.loads(query_args)
@@ -40,8 +41,10 @@ def get_product_filter_data(query_args=None):
 		start = cint(query_args.start) if query_args.get("start") else 0
 		item_group = query_args.get("item_group")
 		from_filters = query_args.get("from_filters")
+		with_facet_counts = query_args.get("with_facet_counts")
 	else:
 		search, attribute_filters, item_group, from_filters = None, None, None, None
+		with_facet_counts = None
 		field_filters = {}
 		start = 0
 
@@ -75,6 +78,10 @@ def get_product_filter_data(query_args=None):
 		filter_engine = ProductFiltersBuilder()
 		filters["discount_filters"] = filter_engine.get_discount_filters(discounts)
 
+	if with_facet_counts:
+		filter_engine = ProductFiltersBuilder(item_group)
+		filters["facet_counts"] = filter_engine.get_facet_counts(engine)
+
 	return {
 		"items": result["items"] or [],
 		"filters": filters,
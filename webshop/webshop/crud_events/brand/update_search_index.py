@@ -0,0 +1,12 @@
+import frappe
+
+from webshop.webshop.redisearch_utils import queue_index_sync
+
+
+def execute(doc, method=None, old_name=None, new_name=None, merge=False):
+    """
+    Reindex the brand's Website Items on rename, the link is renamed with raw SQL
+    and the brand is indexed to filter listings.
+    """
+    web_items = frappe.get_all("Website Item", filters={"brand": doc.name}, pluck="name")
+    queue_index_sync(web_items)
@@ -0,0 +1,3 @@
+def get_attributes(doc):
+    "Return the (attribute, attribute value) pairs of an Item's variant attributes."
+    return [(d.attribute, d.attribute_value) for d in doc.get("attributes")]
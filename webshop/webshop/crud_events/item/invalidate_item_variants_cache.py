@@ -1,4 +1,5 @@
 import frappe
+from webshop.webshop.crud_events.item import get_attributes
 from webshop.webshop.variant_selector.item_variants_cache import (
     ItemVariantsCacheManager,
 )
@@ -18,6 +19,19 @@ def execute(doc, method=None, old_name=None, new_name=None, merge=False):
     elif doc.variant_of and is_published:
         item_code = doc.variant_of
 
-    if item_code:
-        item_cache = ItemVariantsCacheManager(item_code)
-        item_cache.rebuild_cache()
+    # other Item fields are not part of the cache
+    if item_code and (method == "after_rename" or has_variant_structure_changed(doc)):
+        ItemVariantsCacheManager(item_code).rebuild_cache()
+
+
+def has_variant_structure_changed(doc):
+    """Return True if the change affects which variants/attribute values exist."""
+    doc_before_save = doc.get_doc_before_save()
+    if not doc_before_save:
+        return True
+
+    for field in ("disabled", "variant_of", "has_variants"):
+        if doc_before_save.get(field) != doc.get(field):
+            return True
+
+    return get_attributes(doc_before_save) != get_attributes(doc)
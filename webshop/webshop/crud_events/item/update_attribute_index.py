@@ -0,0 +1,22 @@
+from webshop.webshop.crud_events.item import get_attributes
+from webshop.webshop.product_data_engine.attribute_index import ItemAttributeIndex
+
+
+def execute(doc, method=None, old_name=None, new_name=None, merge=False):
+    """
+    Keep the attribute filter index in sync with the Item's attributes.
+    """
+    index = ItemAttributeIndex()
+
+    if method == "after_rename":
+        # item codes are spread across all attributes, rebuild lazily
+        index.clear()
+        return
+
+    # on delete, the item's rows are gone and must be dropped from the index
+    old_values = get_attributes(doc)
+    doc_before_save = doc.get_doc_before_save()
+    if doc_before_save:
+        old_values += get_attributes(doc_before_save)
+
+    index.update_item(doc.name, old_values)
@@ -0,0 +1,18 @@
+import frappe
+
+from webshop.webshop.crud_events.item import get_attributes
+from webshop.webshop.redisearch_utils import queue_index_sync
+
+
+def execute(doc, method=None):
+    """
+    Reindex the Website Item if the Item's variant attributes changed,
+    as they are indexed to filter listings.
+    """
+    doc_before_save = doc.get_doc_before_save()
+    if not doc_before_save or get_attributes(doc) == get_attributes(doc_before_save):
+        return
+
+    web_item = frappe.db.exists("Website Item", {"item_code": doc.name})
+    if web_item:
+        queue_index_sync([web_item])
@@ -0,0 +1,18 @@
+import frappe
+from webshop.webshop.doctype.website_item_discount.website_item_discount import (
+    enqueue_refresh_website_item_discounts,
+)
+
+
+def execute(doc, method=None):
+    """
+    Refresh stored discounts of the item (and its variants, which fall back to
+    the template's price) if the price changes.
+    """
+    if not doc.selling:
+        return
+
+    item_codes = [doc.item_code]
+    item_codes += frappe.get_all("Item", filters={"variant_of": doc.item_code}, pluck="name")
+
+    enqueue_refresh_website_item_discounts(item_codes)
@@ -0,0 +1,14 @@
+from webshop.webshop.doctype.website_item_discount.website_item_discount import (
+    enqueue_refresh_website_item_discounts,
+)
+
+
+def execute(doc, method=None):
+    """
+    Refresh stored discounts of all Website Items, since a Pricing Rule can
+    apply on Item Groups, Brands, etc.
+    """
+    if not doc.selling:
+        return
+
+    enqueue_refresh_website_item_discounts()
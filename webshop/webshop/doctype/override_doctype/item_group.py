@@ -5,7 +5,12 @@ from frappe.utils import get_url, cint
 from frappe.website.website_generator import WebsiteGenerator
 from erpnext.setup.doctype.item_group.item_group import ItemGroup
 from frappe.website.utils import clear_cache
-from webshop.webshop.product_data_engine.filters import ProductFiltersBuilder
+from webshop.webshop.redisearch_utils import queue_index_sync, update_item_group_in_ac_dict
+from webshop.webshop.utils.nested_set import NestedSetTree, clear_tree, get_tree
+from webshop.webshop.product_data_engine.filters import (
+	clear_product_filters_cache,
+	get_product_filters,
+)
 
 class WebshopItemGroup(ItemGroup, WebsiteGenerator):
 	nsm_parent_field = "parent_item_group"
@@ -22,7 +27,10 @@ class WebshopItemGroup(ItemGroup, WebsiteGenerator):
 		super(WebshopItemGroup, self).validate()
 
 	def on_update(self):
+		clear_item_group_tree()
 		invalidate_cache_for(self)
+		clear_product_filters_cache()
+		update_item_group_in_ac_dict(self)
 		super(WebshopItemGroup, self).on_update()
 
 	def make_route(self):
@@ -44,7 +52,17 @@ class WebshopItemGroup(ItemGroup, WebsiteGenerator):
 
 	def on_trash(self):
 		WebsiteGenerator.on_trash(self)
+		clear_product_filters_cache()
+		update_item_group_in_ac_dict(self, deleted=True)
 		super(WebshopItemGroup, self).on_trash()
+		clear_item_group_tree()
+
+	def after_rename(self, old_name, new_name, merge=False):
+		super(WebshopItemGroup, self).after_rename(old_name, new_name, merge)
+		clear_item_group_tree()
+		update_item_group_in_ac_dict(self, old_name=old_name)
+		# links are renamed with raw SQL, reindex the item groups of the Website Items
+		queue_index_sync(get_website_items_in_item_group(new_name))
 
 	def get_context(self, context):
 		context.show_search = True
@@ -54,10 +72,7 @@ class WebshopItemGroup(ItemGroup, WebsiteGenerator):
 		)
 		context.search_link = "/product_search"
 
-		filter_engine = ProductFiltersBuilder(self.name)
-
-		context.field_filters = filter_engine.get_field_filters()
-		context.attribute_filters = filter_engine.get_attribute_filters()
+		context.field_filters, context.attribute_filters = get_product_filters(self.name)
 
 		context.update({"parents": get_parent_item_groups(self.parent_item_group), "title": self.name})
 
@@ -116,15 +131,12 @@ def get_parent_item_groups(item_group_name, from_item=False):
 	if not item_group_name:
 		return base_parents
 
-	item_group = frappe.db.get_value("Item Group", item_group_name, ["lft", "rgt"], as_dict=1)
-	parent_groups = frappe.db.sql(
-		"""select name, route from `tabItem Group`
-		where lft <= %s and rgt >= %s
-		and show_in_website=1
-		order by lft asc""",
-		(item_group.lft, item_group.rgt),
-		as_dict=True,
-	)
+	tree = get_item_group_tree()
+	parent_groups = [
+		frappe._dict(name=name, route=tree.nodes[name].route)
+		for name in tree.get_ancestors(item_group_name, include_self=True)
+		if tree.nodes[name].show_in_website
+	]
 
 	return base_parents + parent_groups
 
@@ -133,20 +145,59 @@ def invalidate_cache_for(doc, item_group=None):
 	if not item_group:
 		item_group = doc.name
 
-	for d in get_parent_item_groups(item_group):
-		item_group_name = frappe.db.get_value("Item Group", d.get("name"))
-		if item_group_name:
-			clear_cache(frappe.db.get_value("Item Group", item_group_name, "route"))
+	tree = get_item_group_tree()
+	for name in tree.get_ancestors(item_group, include_self=True):
+		if tree.nodes[name].show_in_website:
+			clear_cache(tree.nodes[name].route)
 
 def get_child_groups_for_website(item_group_name, immediate=False, include_self=False):
 	"""Returns child item groups *excluding* passed group."""
-	item_group = frappe.get_cached_value("Item Group", item_group_name, ["lft", "rgt"], as_dict=1)
-	filters = {"lft": [">", item_group.lft], "rgt": ["<", item_group.rgt], "show_in_website": 1}
+	tree = get_item_group_tree()
 
 	if immediate:
-		filters["parent_item_group"] = item_group_name
+		names = list(tree.children.get(item_group_name, []))
+	else:
+		names = tree.get_descendants(item_group_name)
+
+	if include_self and item_group_name in tree.nodes:
+		names.append(item_group_name)
+
+	child_groups = [
+		frappe._dict(name=name, route=tree.nodes[name].route)
+		for name in names
+		if tree.nodes[name].show_in_website
+	]
+
+	return sorted(child_groups, key=lambda d: d.name)
+
 
-	if include_self:
-		filters.update({"lft": [">=", item_group.lft], "rgt": ["<=", item_group.rgt]})
+class ItemGroupTree(NestedSetTree):
+	"""Snapshot of the Item Group tree for breadcrumb and descendant lookups."""
+
+	doctype = "Item Group"
+	parent_field = "parent_item_group"
+	fields = ["show_in_website", "include_descendants", "route"]
+
+	def include_descendants(self, item_group):
+		return bool(self.nodes.get(item_group, {}).get("include_descendants"))
+
+
+def get_item_group_tree():
+	"Return the process level Item Group tree snapshot (see `get_tree`)."
+	return get_tree(ItemGroupTree)
+
+
+def clear_item_group_tree():
+	clear_tree("Item Group")
+
+
+def get_website_items_in_item_group(item_group):
+	"Return Website Items having `item_group` as their item group or a website item group."
+	web_items = frappe.get_all("Website Item", filters={"item_group": item_group}, pluck="name")
+	web_items += frappe.get_all(
+		"Website Item Group",
+		filters={"item_group": item_group, "parenttype": "Website Item"},
+		pluck="parent",
+	)
 
-	return frappe.get_all("Item Group", filters=filters, fields=["name", "route"], order_by="name")
\ No newline at end of file
+	return list(dict.fromkeys(web_items))
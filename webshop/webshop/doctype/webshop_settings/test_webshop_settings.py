@@ -7,6 +7,7 @@ import frappe
 from webshop.webshop.doctype.webshop_settings.webshop_settings import (
 	ShoppingCartSetupError,
 )
+from webshop.webshop.redisearch_utils import get_redisearch_status
 
 
 class TestWebshopSettings(unittest.TestCase):
@@ -39,6 +40,23 @@ class TestWebshopSettings(unittest.TestCase):
 
 		self.assertRaises(frappe.ValidationError, settings.save)
 
+	def test_redisearch_status_cleared_on_save(self):
+		"Check if redisearch probes are cached in the process until settings are saved."
+		probes = []
+
+		def probe():
+			probes.append(1)
+			return True
+
+		self.assertTrue(get_redisearch_status("test_probe", probe))
+		self.assertTrue(get_redisearch_status("test_probe", probe))
+		self.assertEqual(len(probes), 1)
+
+		frappe.get_doc("Webshop Settings").save()
+
+		get_redisearch_status("test_probe", probe)
+		self.assertEqual(len(probes), 2)
+
 
 def setup_webshop_settings(values_dict):
 	"Accepts a dict of values that updates Webshop Settings."
@@ -7,9 +7,9 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils import comma_and, flt, unique
 
+from webshop.webshop.product_data_engine.filters import clear_product_filters_cache
 from webshop.webshop.redisearch_utils import (
-	create_website_items_index,
-	define_autocomplete_dictionary,
+	clear_redisearch_status,
 	get_indexable_web_fields,
 	is_search_module_loaded,
 )
@@ -43,13 +43,42 @@ class WebshopSettings(Document):
 
 	def after_save(self):
 		self.create_redisearch_indexes()
+		self.update_search_fulltext_index()
 
 	def create_redisearch_indexes(self):
-		# if redisearch is enabled (value changed) create indexes and dictionary
+		"""Build the index and dictionaries in the background if redisearch was just enabled
+		or the indexed fields changed. Live searches keep using the current index until the
+		new one is swapped in."""
+		if not (self.is_redisearch_enabled and is_search_module_loaded()):
+			return
+
+		old_doc = self.get_doc_before_save()
 		value_changed = self.is_redisearch_enabled != self.is_redisearch_enabled_pre_save
-		if self.is_redisearch_loaded and self.is_redisearch_enabled and value_changed:
-			define_autocomplete_dictionary()
-			create_website_items_index()
+		fields_changed = old_doc and old_doc.search_index_fields != self.search_index_fields
+
+		if value_changed or fields_changed:
+			# once per save, and deduplicated across saves
+			frappe.enqueue(
+				"webshop.webshop.redisearch_utils.create_website_items_index",
+				queue="long",
+				enqueue_after_commit=True,
+				job_id="create_website_items_index",
+				deduplicate=True,
+			)
+
+	def update_search_fulltext_index(self):
+		"Add or drop the Website Item FULLTEXT index in the background if it was toggled."
+		old_doc = self.get_doc_before_save()
+		if old_doc and old_doc.enable_fulltext_search == self.enable_fulltext_search:
+			return
+
+		frappe.enqueue(
+			"webshop.webshop.doctype.website_item.website_item.update_search_fulltext_index",
+			queue="long",
+			enqueue_after_commit=True,
+			job_id="update_search_fulltext_index",
+			deduplicate=True,
+		)
 
 	@staticmethod
 	def validate_field_filters(filter_fields, enable_field_filters):
@@ -148,15 +177,8 @@ class WebshopSettings(Document):
 		return self.get_name_from_territory(shipping_territory, "shipping_rules", "shipping_rule")
 
 	def on_change(self):
-		old_doc = self.get_doc_before_save()
-
-		if old_doc:
-			old_fields = old_doc.search_index_fields
-			new_fields = self.search_index_fields
-
-			# if search index fields get changed
-			if not (new_fields == old_fields):
-				create_website_items_index()
+		clear_product_filters_cache()
+		clear_redisearch_status()
 
 
 def validate_cart_settings(doc=None, method=None):
@@ -17,7 +17,10 @@ from webshop.webshop.doctype.website_item.website_item import make_website_item
 from webshop.webshop.shopping_cart.product_info import get_product_info_for_website
 from webshop.webshop.doctype.override_doctype.item import DataValidationError
 from erpnext.stock.doctype.item.test_item import make_item
-from webshop.webshop.doctype.override_doctype.item_group import get_parent_item_groups
+from webshop.webshop.doctype.override_doctype.item_group import (
+	clear_item_group_tree,
+	get_parent_item_groups,
+)
 
 WEBITEM_DESK_TESTS = ("test_website_item_desk_item_sync", "test_publish_variant_and_template")
 WEBITEM_PRICE_TESTS = (
@@ -80,6 +83,7 @@ class TestWebsiteItem(unittest.TestCase):
 		"Check if index is getting created in db."
 		from webshop.webshop.doctype.website_item.website_item import on_doctype_update
 
+		frappe.db.set_single_value("Webshop Settings", "enable_fulltext_search", 1)
 		on_doctype_update()
 
 		indices = frappe.db.sql("show index from `tabWebsite Item`", as_dict=1)
@@ -90,6 +94,16 @@ class TestWebsiteItem(unittest.TestCase):
 		if expected_columns:
 			self.fail(f"Expected db index on these columns: {', '.join(expected_columns)}")
 
+		if frappe.db.db_type == "mariadb":
+			fulltext_indices = {
+				index.get("Key_name") for index in indices if index.get("Index_type") == "FULLTEXT"
+			}
+			self.assertIn("website_item_search", fulltext_indices)
+
+		# tear down, DDL commits implicitly
+		frappe.db.set_single_value("Webshop Settings", "enable_fulltext_search", 0)
+		on_doctype_update()
+
 	def test_website_item_desk_item_sync(self):
 		"Check creation/updation/deletion of Website Item and its impact on Item master."
 		web_item = None
@@ -192,6 +206,7 @@ class TestWebsiteItem(unittest.TestCase):
 
 		frappe.db.set_value("Item Group", "_Test Item Group B - 1", "show_in_website", 1)
 		frappe.db.set_value("Item Group", "_Test Item Group B", "show_in_website", 1)
+		clear_item_group_tree()
 
 		breadcrumbs = get_parent_item_groups(item.item_group)
 
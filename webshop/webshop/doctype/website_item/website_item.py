@@ -10,16 +10,17 @@ if TYPE_CHECKING:
 
 import frappe
 from frappe import _
-from frappe.utils import cint, cstr, flt, random_string
+from frappe.utils import cstr, flt, random_string
 from frappe.website.doctype.website_slideshow.website_slideshow import get_slideshow
 from frappe.website.website_generator import WebsiteGenerator
 
 from webshop.webshop.doctype.item_review.item_review import get_item_reviews
-from webshop.webshop.redisearch_utils import (
-    delete_item_from_index,
-    insert_item_to_index,
-    update_index_for_item,
+from webshop.webshop.doctype.website_item_discount.website_item_discount import (
+    enqueue_refresh_website_item_discounts,
 )
+from webshop.webshop.product_data_engine.attribute_index import ItemAttributeIndex
+from webshop.webshop.product_data_engine.filters import clear_product_filters_cache
+from webshop.webshop.redisearch_utils import queue_index_update
 from webshop.webshop.shopping_cart.cart import _set_price_list
 from webshop.webshop.doctype.override_doctype.item_group import (
     get_parent_item_groups,
@@ -28,9 +29,19 @@ from webshop.webshop.doctype.override_doctype.item_group import (
 from erpnext.stock.doctype.item.item import Item
 from erpnext.utilities.product import get_price
 from webshop.webshop.shopping_cart.cart import get_party
-from webshop.webshop.variant_selector.item_variants_cache import (
-    ItemVariantsCacheManager,
+from webshop.webshop.variant_selector.item_variants_cache import get_item_attribute_values
+
+SEARCH_FULLTEXT_INDEX = "website_item_search"
+SEARCH_FULLTEXT_FIELDS = (
+	"item_code",
+	"item_name",
+	"web_item_name",
+	"item_group",
+	"brand",
+	"web_long_description",
 )
+# innodb_ft_min_token_size default
+SEARCH_FULLTEXT_MIN_WORD_LENGTH = 3
 
 
 class WebsiteItem(WebsiteGenerator):
@@ -81,12 +92,21 @@ class WebsiteItem(WebsiteGenerator):
 	def on_update(self):
 		invalidate_cache_for_web_item(self)
 		self.update_template_item()
+		self.refresh_discounts()
 
 	def on_trash(self):
 		super(WebsiteItem, self).on_trash()
-		delete_item_from_index(self)
+		queue_index_update(self, deleted=True)
+		clear_product_filters_cache()
+		frappe.db.delete("Website Item Discount", {"website_item": self.name})
 		self.publish_unpublish_desk_item(publish=False)
 
+	def refresh_discounts(self):
+		"Compute the stored discounts of a created or newly published item."
+		doc_before_save = self.get_doc_before_save()
+		if self.published and not (doc_before_save and doc_before_save.published):
+			enqueue_refresh_website_item_discounts([self.item_code])
+
 	def validate_duplicate_website_item(self):
 		existing_web_item = frappe.db.exists(
 			"Website Item", {"item_code": self.item_code}
@@ -104,6 +124,7 @@ class WebsiteItem(WebsiteGenerator):
 		):
 			return  # if already published don't publish again
 		frappe.db.set_value("Item", self.item_code, "published_in_website", publish)
+		ItemAttributeIndex().update_item(self.item_code)
 
 	def make_route(self):
 		"""Called from set_route in WebsiteGenerator."""
@@ -294,27 +315,20 @@ class WebsiteItem(WebsiteGenerator):
 	def set_attribute_values(self, attributes, context, attribute_values_available):
 		for attr in attributes:
 			values = context.attribute_values.setdefault(attr.attribute, [])
+			item_attribute_values = get_item_attribute_values(attr.attribute)
 
-			if cint(
-				frappe.db.get_value("Item Attribute", attr.attribute, "numeric_values")
-			):
+			if item_attribute_values.numeric_values:
 				for val in sorted(
 					attribute_values_available.get(attr.attribute, []), key=flt
 				):
 					values.append(val)
 			else:
-				# get list of values defined (for sequence)
-				for attr_value in frappe.db.get_all(
-					"Item Attribute Value",
-					fields=["attribute_value"],
-					filters={"parent": attr.attribute},
-					order_by="idx asc",
-				):
-
-					if attr_value.attribute_value in attribute_values_available.get(
+				# list of values defined (for sequence)
+				for attribute_value in item_attribute_values.values:
+					if attribute_value in attribute_values_available.get(
 						attr.attribute, []
 					):
-						values.append(attr_value.attribute_value)
+						values.append(attribute_value)
 
 	def set_metatags(self, context):
 		context.metatags = frappe._dict({})
@@ -421,33 +435,9 @@ class WebsiteItem(WebsiteGenerator):
 		return items
 
 
-def invalidate_item_variants_cache_for_website(doc):
-	"""
-	Rebuild ItemVariantsCacheManager via Item or Website Item
-
-	Args:
-		doc (Item): item of which cache should be cleared
-	"""
-	item_code = None
-	is_web_item = doc.get("published_in_website") or doc.get("published")
-
-	if doc.has_variants and is_web_item:
-		item_code = doc.item_code
-	elif doc.variant_of and frappe.db.get_value(
-		"Item", doc.variant_of, "published_in_website"
-	):
-		item_code = doc.variant_of
-
-	if not item_code:
-		return
-
-	item_cache = ItemVariantsCacheManager(item_code)
-	item_cache.rebuild_cache()
-
-
 def invalidate_cache_for_web_item(doc):
 	"""
-	Invalidate Website Item Group cache and rebuild ItemVariantsCacheManager
+	Invalidate Website Item Group cache
 	Args:
 		doc (Item): document against which cache should be cleared
 	"""
@@ -467,15 +457,70 @@ def invalidate_cache_for_web_item(doc):
 	for item_group in website_item_groups:
 		invalidate_cache_for(doc, item_group)
 
-	# Update Search Cache
-	update_index_for_item(doc)
+	clear_product_filters_cache()
 
-	invalidate_item_variants_cache_for_website(doc)
+	# Update Search Cache, after commit
+	queue_index_update(doc)
 
 
 def on_doctype_update():
 	# since route is a Text column, it needs a length for indexing
 	frappe.db.add_index("Website Item", ["route(500)"])
+	update_search_fulltext_index()
+
+
+def update_search_fulltext_index():
+	"""Add or drop the FULLTEXT index on searchable fields as per Webshop Settings.
+	It serves searches without RediSearch (MariaDB only), at a write cost on every save."""
+	if frappe.db.db_type != "mariadb":
+		return
+
+	if frappe.db.get_single_value("Webshop Settings", "enable_fulltext_search"):
+		add_search_fulltext_index()
+	elif frappe.db.has_index("tabWebsite Item", SEARCH_FULLTEXT_INDEX):
+		frappe.db.sql_ddl(f"alter table `tabWebsite Item` drop index `{SEARCH_FULLTEXT_INDEX}`")
+
+	frappe.cache().delete_value(SEARCH_FULLTEXT_INDEX)
+
+
+def add_search_fulltext_index():
+	if not frappe.db.has_index("tabWebsite Item", SEARCH_FULLTEXT_INDEX):
+		columns = ", ".join(f"`{field}`" for field in SEARCH_FULLTEXT_FIELDS)
+		try:
+			frappe.db.sql_ddl(
+				f"alter table `tabWebsite Item` add fulltext index `{SEARCH_FULLTEXT_INDEX}` ({columns})"
+			)
+		except Exception:
+			# search falls back to LIKE
+			frappe.log_error("Website Item FULLTEXT index creation failed")
+
+
+def has_search_fulltext_index():
+	return frappe.db.db_type == "mariadb" and frappe.cache().get_value(
+		SEARCH_FULLTEXT_INDEX,
+		generator=lambda: frappe.db.has_index("tabWebsite Item", SEARCH_FULLTEXT_INDEX),
+	)
+
+
+def get_search_fulltext_query(search_term):
+	"""Return a boolean mode FULLTEXT query matching all words of `search_term` as prefixes,
+	None if the term has to be searched with LIKE instead."""
+	words = "".join(c if c.isalnum() else " " for c in cstr(search_term)).split()
+
+	# shorter words are not indexed
+	if not words or any(len(word) < SEARCH_FULLTEXT_MIN_WORD_LENGTH for word in words):
+		return None
+
+	if not has_search_fulltext_index():
+		return None
+
+	return " ".join(f"+{word}*" for word in words)
+
+
+def get_search_fulltext_condition():
+	"Condition matching the `search` query parameter (see `get_search_fulltext_query`)."
+	columns = ", ".join(f"`{field}`" for field in SEARCH_FULLTEXT_FIELDS)
+	return f"match({columns}) against (%(search)s in boolean mode)"
 
 
 def check_if_user_is_customer(user=None):
@@ -539,9 +584,7 @@ def make_website_item(doc, save=True):
 	if not save:
 		return website_item
 
+	# also queued to the search cache
 	website_item.save()
 
-	# Add to search cache
-	insert_item_to_index(website_item)
-
 	return [website_item.name, website_item.web_item_name]
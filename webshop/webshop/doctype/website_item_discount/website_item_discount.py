@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import flt, now
+
+from webshop.webshop.utils.product import get_item_prices
+
+
+class WebsiteItemDiscount(Document):
+	pass
+
+
+def refresh_website_item_discounts(item_codes=None, chunk_size=500):
+	"""
+	Recompute the effective discount of published Website Items per selling Price List.
+	Product listings filter by discount against these rows (see `ProductQuery`),
+	so Pricing Rules need not be evaluated for every matching item on each request.
+	"""
+	filters = {"published": 1}
+	if item_codes:
+		filters["item_code"] = ["in", item_codes]
+
+	web_items = frappe.get_all(
+		"Website Item", filters=filters, fields=["name", "item_code", "variant_of"], order_by="name"
+	)
+
+	for start in range(0, len(web_items), chunk_size):
+		update_discounts(web_items[start : start + chunk_size])
+		if not frappe.flags.in_test:
+			# release locks between chunks of the (hourly) full refresh
+			frappe.db.commit()  # nosemgrep
+
+
+def update_discounts(web_items):
+	settings = frappe.get_cached_doc("Webshop Settings")
+	web_item_map = {d.item_code: d.name for d in web_items}
+	item_codes = list(web_item_map)
+	template_codes = list({d.variant_of for d in web_items if d.variant_of})
+
+	price_lists = frappe.get_all(
+		"Item Price",
+		filters={"item_code": ["in", item_codes + template_codes], "selling": 1},
+		pluck="price_list",
+		distinct=True,
+	)
+	if price_lists:
+		price_lists = frappe.get_all(
+			"Price List", filters={"name": ["in", price_lists], "enabled": 1}, pluck="name"
+		)
+
+	values = []
+	timestamp = now()
+	for price_list in price_lists:
+		prices = get_item_prices(
+			item_codes, price_list, settings.default_customer_group, settings.company
+		)
+
+		for item_code, price in prices.items():
+			discount_percent = flt(price.get("discount_percent"))
+			if discount_percent <= 0:
+				continue
+
+			values.append(
+				(
+					frappe.generate_hash(length=10),
+					timestamp,
+					timestamp,
+					"Administrator",
+					"Administrator",
+					0,
+					web_item_map[item_code],
+					price_list,
+					discount_percent,
+				)
+			)
+
+	frappe.db.delete("Website Item Discount", {"website_item": ["in", list(web_item_map.values())]})
+
+	if values:
+		frappe.db.bulk_insert(
+			"Website Item Discount",
+			fields=[
+				"name",
+				"creation",
+				"modified",
+				"owner",
+				"modified_by",
+				"docstatus",
+				"website_item",
+				"price_list",
+				"discount_percent",
+			],
+			values=values,
+		)
+
+
+def on_doctype_update():
+	# one row per Website Item and Price List, also serves listing lookups
+	frappe.db.add_unique(
+		"Website Item Discount",
+		["website_item", "price_list"],
+		constraint_name="unique_website_item_price_list",
+	)
+
+
+def enqueue_refresh_website_item_discounts(item_codes=None):
+	job_id = "refresh_website_item_discounts" if not item_codes else None
+	frappe.enqueue(
+		"webshop.webshop.doctype.website_item_discount.website_item_discount.refresh_website_item_discounts",
+		queue="long",
+		item_codes=item_codes,
+		enqueue_after_commit=True,
+		job_id=job_id,
+		deduplicate=bool(job_id),
+	)
@@ -0,0 +1,161 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+import frappe
+from redis.exceptions import WatchError
+
+from webshop.webshop.utils.cache import make_key, redis, run_now_and_after_commit
+
+ATTRIBUTE_INDEX_KEY = "website_item_attribute_index"
+# attributes whose value sets are complete
+ATTRIBUTE_INDEX_BUILT_KEY = "website_item_attribute_index_built"
+# bumped on every item update of an attribute, builds are discarded if it changes meanwhile
+ATTRIBUTE_INDEX_VERSION_KEY = "website_item_attribute_index_version"
+
+
+class ItemAttributeIndex:
+	"""Inverted index of (attribute, attribute value) -> published item codes.
+
+	Stored as one redis set of item codes per attribute value. Attributes are indexed
+	lazily on first use. Item updates add or remove the item in the affected sets
+	(SADD/SREM), so concurrent updates never overwrite each other.
+	"""
+
+	def get_item_codes(self, attribute_filters):
+		"""Return sorted item codes matching all attribute filters (AND across attributes,
+		OR across values of an attribute)."""
+		item_code_sets = []
+
+		for attribute, values in attribute_filters.items():
+			if not isinstance(values, list):
+				values = [values]
+
+			item_code_sets.append(self.get_attribute_item_codes(attribute, values))
+
+		if not item_code_sets:
+			return []
+
+		# intersect starting with the smallest set
+		item_code_sets.sort(key=len)
+		return sorted(set.intersection(*item_code_sets))
+
+	def get_attribute_item_codes(self, attribute, values):
+		"""Item codes having any of `values` for `attribute`."""
+		if not redis().sismember(make_key(ATTRIBUTE_INDEX_BUILT_KEY), attribute):
+			value_map = self.build_attribute(attribute)
+			return {item_code for value in values for item_code in value_map.get(value, [])}
+
+		if not values:
+			return set()
+
+		keys = [get_value_key(attribute, value) for value in values]
+		return {frappe.safe_decode(item_code) for item_code in redis().sunion(keys)}
+
+	def build_attribute(self, attribute):
+		"""Index an attribute from the DB. The index is not marked as built if an item of the
+		attribute was updated meanwhile, the next reader builds it again.
+
+		Returns:
+		        dict: {attribute_value: [item_code1, item_code2, ...]}
+		"""
+		with redis().pipeline() as pipeline:
+			pipeline.watch(get_version_key(attribute))
+			value_map = self.get_attribute_value_map(attribute)
+
+			pipeline.multi()
+			for attribute_value, item_codes in value_map.items():
+				pipeline.sadd(get_value_key(attribute, attribute_value), *item_codes)
+			pipeline.sadd(make_key(ATTRIBUTE_INDEX_BUILT_KEY), attribute)
+
+			try:
+				pipeline.execute()
+			except WatchError:
+				pass
+
+		return value_map
+
+	def get_attribute_value_map(self, attribute):
+		iva = frappe.qb.DocType("Item Variant Attribute")
+		item = frappe.qb.DocType("Item")
+		query = (
+			frappe.qb.from_(iva)
+			.join(item)
+			.on(item.name == iva.parent)
+			.select(iva.attribute_value, iva.parent)
+			.where(
+				(iva.parenttype == "Item")
+				& (iva.attribute == attribute)
+				& (item.published_in_website == 1)
+			)
+		)
+
+		value_map = {}
+		for attribute_value, item_code in query.run():
+			if attribute_value:
+				value_map.setdefault(attribute_value, []).append(item_code)
+
+		return value_map
+
+	def update_item(self, item_code, old_values=None):
+		"""Sync an item's entries in the index, now and again after commit.
+
+		Args:
+		        item_code (str): Item to sync
+		        old_values (list, optional): (attribute, attribute value) pairs the item had
+		                before the update
+		"""
+		item_values = frappe.get_all(
+			"Item Variant Attribute",
+			filters={"parenttype": "Item", "parent": item_code},
+			fields=["attribute", "attribute_value"],
+			as_list=True,
+		)
+		item_values = {(attribute, value) for attribute, value in item_values if value}
+		old_values = {(attribute, value) for attribute, value in old_values or [] if value}
+
+		if frappe.db.get_value("Item", item_code, "published_in_website"):
+			removed, added = old_values - item_values, item_values
+		else:
+			removed, added = old_values | item_values, set()
+
+		if not (removed or added):
+			return
+
+		run_now_and_after_commit(lambda: update_item_sets(item_code, removed, added))
+		# changes applied above are not committed, index the attributes again
+		attributes = {attribute for attribute, _value in removed | added}
+		frappe.db.after_rollback.add(lambda: self.clear(attributes))
+
+	def clear(self, attributes=None):
+		"""Drop the index of `attributes` (all attributes if not set)."""
+		if attributes is None:
+			frappe.cache().delete_keys(ATTRIBUTE_INDEX_KEY)
+			return
+
+		for attribute in attributes:
+			redis().srem(make_key(ATTRIBUTE_INDEX_BUILT_KEY), attribute)
+			frappe.cache().delete_keys(f"{ATTRIBUTE_INDEX_KEY}:{attribute}:")
+
+
+def update_item_sets(item_code, removed, added):
+	"""Atomically move an item out of the `removed` and into the `added` value sets."""
+	pipeline = redis().pipeline()
+	for attribute, attribute_value in removed:
+		pipeline.srem(get_value_key(attribute, attribute_value), item_code)
+	for attribute, attribute_value in added:
+		pipeline.sadd(get_value_key(attribute, attribute_value), item_code)
+	for attribute in {attribute for attribute, _value in removed | added}:
+		pipeline.incr(get_version_key(attribute))
+	pipeline.execute()
+
+
+def get_value_key(attribute, attribute_value):
+	return make_key(f"{ATTRIBUTE_INDEX_KEY}:{attribute}:{attribute_value}")
+
+
+def get_version_key(attribute):
+	return make_key(f"{ATTRIBUTE_INDEX_VERSION_KEY}:{attribute}")
+
+
+def clear_attribute_index():
+	ItemAttributeIndex().clear()
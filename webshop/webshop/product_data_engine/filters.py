@@ -3,6 +3,10 @@
 import frappe
 from frappe.utils import floor
 
+from webshop.webshop.utils.cache import run_now_and_after_commit
+
+PRODUCT_FILTERS_CACHE_KEY = "product_filters"
+
 
 class ProductFiltersBuilder:
 	def __init__(self, item_group=None):
@@ -14,7 +18,10 @@ class ProductFiltersBuilder:
 		self.item_group = item_group
 
 	def get_field_filters(self):
-		from webshop.webshop.doctype.override_doctype.item_group import get_child_groups_for_website
+		from webshop.webshop.doctype.override_doctype.item_group import (
+			get_child_groups_for_website,
+			get_item_group_tree,
+		)
 
 		if not self.item_group and not self.doc.enable_field_filters:
 			return
@@ -34,7 +41,7 @@ class ProductFiltersBuilder:
 
 			if df.fieldtype == "Link":
 				if self.item_group:
-					include_child = frappe.db.get_value("Item Group", self.item_group, "include_descendants")
+					include_child = get_item_group_tree().include_descendants(self.item_group)
 					if include_child:
 						include_groups = get_child_groups_for_website(self.item_group, include_self=True)
 						include_groups = [x.name for x in include_groups]
@@ -135,6 +142,17 @@ class ProductFiltersBuilder:
 			out.append(frappe._dict(name=name, item_attribute_values=values))
 		return out
 
+	def get_facet_counts(self, query_engine):
+		"""Item counts per field & attribute filter value over `query_engine`'s results."""
+		fieldnames, attributes = [], []
+
+		if self.item_group or self.doc.enable_field_filters:
+			fieldnames = [row.fieldname for row in self.doc.filter_fields]
+		if self.item_group or self.doc.enable_attribute_filters:
+			attributes = [row.attribute for row in self.doc.filter_attributes]
+
+		return query_engine.get_facet_counts(fieldnames, attributes)
+
 	def get_discount_filters(self, discounts):
 		discount_filters = []
 
@@ -156,3 +174,46 @@ class ProductFiltersBuilder:
 			discount_filters.append([discount, label])
 
 		return discount_filters
+
+
+def get_product_filters(item_group=None):
+	"""
+	Get field and attribute filters for a listing page (Item Group or all products).
+	Filter data is cached per item group and cleared (see `clear_product_filters_cache`)
+	on Website Item, Item, Item Group, Brand and Webshop Settings updates.
+
+	Returns:
+	        tuple: (field filters, attribute filters)
+	"""
+	cache_key = item_group or "__all__"
+	filter_data = frappe.cache().hget(PRODUCT_FILTERS_CACHE_KEY, cache_key)
+
+	if filter_data is None:
+		filter_engine = ProductFiltersBuilder(item_group)
+		field_filters = filter_engine.get_field_filters()
+
+		filter_data = {
+			# cache fieldnames, docfields are picked from (cached) meta
+			"field_filters": (
+				[[df.fieldname, values] for df, values in field_filters]
+				if field_filters is not None
+				else None
+			),
+			"attribute_filters": filter_engine.get_attribute_filters(),
+		}
+		frappe.cache().hset(PRODUCT_FILTERS_CACHE_KEY, cache_key, filter_data)
+
+	field_filters = filter_data["field_filters"]
+	if field_filters is not None:
+		web_item_meta = frappe.get_meta("Website Item", cached=True)
+		field_filters = [
+			[web_item_meta.get_field(fieldname), values]
+			for fieldname, values in field_filters
+			if web_item_meta.has_field(fieldname)
+		]
+
+	return field_filters, filter_data["attribute_filters"]
+
+
+def clear_product_filters_cache(doc=None, method=None):
+	run_now_and_after_commit(lambda: frappe.cache().delete_key(PRODUCT_FILTERS_CACHE_KEY))
@@ -3,10 +3,20 @@
 
 import frappe
 from frappe.utils import flt
+from redis import ResponseError
 
 from webshop.webshop.doctype.item_review.item_review import get_customer
-from webshop.webshop.shopping_cart.product_info import get_product_info_for_website
-from webshop.webshop.utils.product import get_non_stock_item_status
+from webshop.webshop.product_data_engine.attribute_index import ItemAttributeIndex
+from webshop.webshop.redisearch_utils import (
+	get_attribute_tag,
+	get_index_field_types,
+	get_tag_condition,
+	is_ranking_sortable,
+	is_redisearch_enabled,
+	search_web_item_names,
+)
+from webshop.webshop.shopping_cart.product_info import get_prices_for_website
+from webshop.webshop.utils.product import get_items_stock_availability, get_non_stock_items_status
 
 
 class ProductQuery:
@@ -14,8 +24,8 @@ class ProductQuery:
 
 	Attributes:
 	        fields (list): Fields to fetch in query
-	        conditions (string): Conditions for query building
-	        or_conditions (string): Search conditions
+	        conditions (list): Raw SQL conditions on Website Items, that filters cannot express
+	        condition_values (dict): Values of `conditions`
 	        page_length (Int): Length of page for the query
 	        settings (Document): Webshop Settings DocType
 	"""
@@ -26,6 +36,13 @@ class ProductQuery:
 
 		self.or_filters = []
 		self.filters = [["published", "=", 1]]
+		self.conditions = []
+		self.condition_values = {}
+		self.attributes = None
+		self.attribute_filters_applied = False
+		# filters per field and of attributes, left out by their own facet counts
+		self.field_filters = {}
+		self.attribute_filter = None
 		self.fields = [
 			"web_item_name",
 			"name",
@@ -54,8 +71,6 @@ class ProductQuery:
 		Returns:
 		        dict: Dict containing items, item count & discount range
 		"""
-		# track if discounts included in field filters
-		self.filter_with_discount = bool(fields.get("discount"))
 		result, discount_list, website_item_groups, cart_items, count = [], [], [], [], 0
 
 		if fields:
@@ -67,8 +82,13 @@ class ProductQuery:
 		if self.settings.hide_variants:
 			self.filters.append(["variant_of", "is", "not set"])
 
-		# query results
-		if attributes:
+		self.attributes = attributes
+
+		# query results, from the search index if it can answer the query
+		index_result = self.query_index(attributes, fields, search_term, item_group, start)
+		if index_result:
+			result, count = index_result
+		elif attributes:
 			result, count = self.query_items_with_attributes(attributes, start)
 		else:
 			result, count = self.query_items(start=start)
@@ -85,70 +105,186 @@ class ProductQuery:
 		if discount_list:
 			discounts = [min(discount_list), max(discount_list)]
 
-		result = self.filter_results_by_discount(fields, result)
-
 		return {"items": result, "items_count": count, "discounts": discounts}
 
 	def query_items(self, start=0):
 		"""Build a query to fetch Website Items based on field filters."""
-		# MySQL does not support offset without limit,
-		# frappe does not accept two parameters for limit
-		# https://dev.mysql.com/doc/refman/8.0/en/select.html#id4651989
-		count_items = frappe.db.get_all(
-			"Website Item",
-			filters=self.filters,
-			or_filters=self.or_filters,
-			limit_page_length=184467440737095516,
-			limit_start=start,  # get all items from this offset for total count ahead
-			order_by="ranking desc",
-		)
-		count = len(count_items)
+		count = self.get_items_count(start=start)
+
+		if self.conditions:
+			columns = ", ".join(f"`tabWebsite Item`.`{field}`" for field in self.fields)
+			items = frappe.db.sql(  # nosemgrep
+				self.get_items_query(columns)
+				+ " order by `tabWebsite Item`.ranking desc limit %(page_length)s offset %(start)s",
+				{**self.condition_values, "page_length": self.page_length, "start": start},
+				as_dict=True,
+			)
+		else:
+			items = frappe.db.get_all(
+				"Website Item",
+				fields=self.fields,
+				filters=self.filters,
+				or_filters=self.or_filters,
+				limit_page_length=self.page_length,
+				limit_start=start,
+				order_by="ranking desc",
+			)
+
+		return items, count
+
+	def get_items_count(self, start=0):
+		"""Count Website Items from `start` onwards (for total count ahead) via `COUNT`."""
+		if self.conditions:
+			count = frappe.db.sql(  # nosemgrep
+				self.get_items_query("count(*)"), self.condition_values
+			)[0][0]
+		else:
+			# child table filters (eg. Website Item Group) join rows, count distinct items
+			count = frappe.db.get_all(
+				"Website Item",
+				fields=["count(distinct `tabWebsite Item`.name) as count"],
+				filters=self.filters,
+				or_filters=self.or_filters,
+			)
+			count = count[0].count if count else 0
 
-		# If discounts included, return all rows.
-		# Slice after filtering rows with discount (See `filter_results_by_discount`).
-		# Slicing before hand will miss discounted items on the 3rd or 4th page.
-		# Discounts are fetched on computing Pricing Rules so we cannot query them directly.
-		page_length = 184467440737095516 if self.filter_with_discount else self.page_length
+		return max(count - start, 0)
 
-		items = frappe.db.get_all(
+	def get_items_query(self, columns, filters=None):
+		"""SQL selecting `columns` of Website Items that match the filters (or `filters`)
+		and the raw SQL `conditions`. Run it with `condition_values`.
+		Filters are applied in a subquery, so child table joins do not duplicate rows.
+		"""
+		filtered_items_query = frappe.db.get_all(
 			"Website Item",
-			fields=self.fields,
-			filters=self.filters,
+			fields=["`tabWebsite Item`.name"],
+			filters=self.filters if filters is None else filters,
 			or_filters=self.or_filters,
-			limit_page_length=page_length,
-			limit_start=start,
-			order_by="ranking desc",
+			order_by="",
+			run=0,
 		)
+		conditions = [
+			"`tabWebsite Item`.name in ({0})".format(filtered_items_query.replace("%", "%%"))
+		]
+		conditions.extend(self.conditions)
 
-		return items, count
+		return "select {0} from `tabWebsite Item` where {1}".format(
+			columns, " and ".join(conditions)
+		)
 
 	def query_items_with_attributes(self, attributes, start=0):
 		"""Build a query to fetch Website Items based on field & attribute filters."""
-		item_codes = []
+		self.attributes = attributes
+		if not self.build_attribute_filters():
+			return [], 0
 
-		for attribute, values in attributes.items():
-			if not isinstance(values, list):
-				values = [values]
+		items, count = self.query_items(start=start)
 
-			# get items that have selected attribute & value
-			item_code_list = frappe.db.get_all(
-				"Item",
-				fields=["item_code"],
-				filters=[
-					["published_in_website", "=", 1],
-					["Item Variant Attribute", "attribute", "=", attribute],
-					["Item Variant Attribute", "attribute_value", "in", values],
-				],
+		return items, count
+
+	def build_attribute_filters(self):
+		"""Filter items that have the selected attributes & values (as per the attribute index).
+		Returns the matching item codes."""
+		item_codes = ItemAttributeIndex().get_item_codes(self.attributes)
+
+		if not self.attribute_filters_applied:
+			self.attribute_filter = ["item_code", "in", item_codes]
+			self.filters.append(self.attribute_filter)
+			self.attribute_filters_applied = True
+
+		return item_codes
+
+	def query_index(self, attributes=None, fields=None, search_term=None, item_group=None, start=0):
+		"""Fetch a page of Website Items via the RediSearch index.
+		Matching, ranking order and the total are computed by RediSearch, the page is read from the DB.
+
+		Returns:
+		        tuple: (items, item count), None if the index cannot answer the query
+		"""
+		if not (is_redisearch_enabled() and is_ranking_sortable()):
+			# listings are ordered by ranking
+			return None
+
+		query_string = self.build_index_query(attributes, fields, search_term, item_group)
+		if not query_string:
+			return None
+
+		try:
+			names, total = search_web_item_names(query_string, start, self.page_length)
+		except ResponseError:
+			# index is not built (yet), answer from the DB
+			return None
+
+		items = []
+		if names:
+			items = frappe.get_all(
+				"Website Item",
+				fields=self.fields,
+				filters={"name": ["in", names], "published": 1},
 			)
-			item_codes.append({x.item_code for x in item_code_list})
+			# keep ranking order of the index
+			position = {name: i for i, name in enumerate(names)}
+			items.sort(key=lambda item: position[item.name])
 
-		if item_codes:
-			item_codes = list(set.intersection(*item_codes))
-			self.filters.append(["item_code", "in", item_codes])
+		return items, max(total - start, 0)
 
-		items, count = self.query_items(start=start)
+	def build_index_query(self, attributes=None, fields=None, search_term=None, item_group=None):
+		"""Translate listing filters into a RediSearch query.
 
-		return items, count
+		Returns:
+		        str: Query string, None if a filter cannot be applied on the index
+		"""
+		from webshop.webshop.doctype.override_doctype.item_group import (
+			get_child_groups_for_website,
+			get_item_group_tree,
+		)
+		from webshop.templates.pages.product_search import (
+			build_search_query,
+			clean_up_query,
+		)
+
+		conditions = []
+		field_types = get_index_field_types()
+
+		for field, values in (fields or {}).items():
+			if not values:
+				continue
+
+			# only tag fields are matched exactly (discounts are not indexed)
+			if field_types.get(field) != "TAG":
+				return None
+
+			values = values if isinstance(values, list) else [values]
+			conditions.append(get_tag_condition(field, values))
+
+		if item_group:
+			item_groups = [item_group]
+			if get_item_group_tree().include_descendants(item_group):
+				item_groups = [
+					x.name for x in get_child_groups_for_website(item_group, include_self=True)
+				]
+
+			conditions.append(get_tag_condition("item_groups", item_groups))
+
+		for attribute, values in (attributes or {}).items():
+			values = values if isinstance(values, list) else [values]
+			if not values:
+				return None
+
+			tags = [get_attribute_tag(attribute, value) for value in values]
+			conditions.append(get_tag_condition("attributes", tags))
+
+		if self.settings.hide_variants:
+			conditions.append("@is_variant:[0 0]")
+
+		if search_term:
+			search_term = clean_up_query(search_term)
+			if not search_term.strip():
+				return None
+
+			conditions.append(build_search_query(search_term))
+
+		return " ".join(conditions) or "*"
 
 	def build_fields_filters(self, filters):
 		"""Build filters for field values
@@ -157,28 +293,62 @@ class ProductQuery:
 		        filters (dict): Filters
 		"""
 		for field, values in filters.items():
-			if not values or field == "discount":
+			if not values:
+				continue
+
+			if field == "discount":
+				self.build_discount_filters(values)
 				continue
 
 			# handle multiselect fields in filter addition
 			meta = frappe.get_meta("Website Item", cached=True)
 			df = meta.get_field(field)
+			field_filter = None
 			if df.fieldtype == "Table MultiSelect":
 				child_doctype = df.options
 				child_meta = frappe.get_meta(child_doctype, cached=True)
 				fields = child_meta.get("fields")
 				if fields:
-					self.filters.append([child_doctype, fields[0].fieldname, "IN", values])
+					field_filter = [child_doctype, fields[0].fieldname, "IN", values]
 			elif isinstance(values, list):
 				# If value is a list use `IN` query
-				self.filters.append([field, "in", values])
+				field_filter = [field, "in", values]
 			else:
 				# `=` will be faster than `IN` for most cases
-				self.filters.append([field, "=", values])
+				field_filter = [field, "=", values]
+
+			if field_filter:
+				self.filters.append(field_filter)
+				self.field_filters[field] = field_filter
+
+	def build_discount_filters(self, values):
+		"""Filter items with a discount of `values` percent and below.
+		Discounts are precomputed per Price List (see `Website Item Discount`).
+		"""
+		from webshop.webshop.shopping_cart.cart import _set_price_list
+
+		self.conditions.append(
+			"""exists (
+				select 1 from `tabWebsite Item Discount` discount
+				where discount.website_item = `tabWebsite Item`.name
+					and discount.price_list = %(discount_price_list)s
+					and discount.discount_percent > 0
+					and discount.discount_percent <= %(discount_percent)s
+			)"""
+		)
+		self.condition_values.update(
+			{
+				"discount_price_list": _set_price_list(self.settings, None),
+				"discount_percent": flt(values[0] if isinstance(values, list) else values),
+			}
+		)
 
 	def build_item_group_filters(self, item_group):
 		"Add filters for Item group page and include Website Item Groups."
-		from webshop.webshop.doctype.override_doctype.item_group import get_child_groups_for_website
+		from webshop.webshop.doctype.override_doctype.item_group import (
+			get_child_groups_for_website,
+			get_item_group_tree,
+		)
 
 		item_group_filters = []
 
@@ -186,7 +356,7 @@ class ProductQuery:
 		# Consider Website Item Groups
 		item_group_filters.append(["Website Item Group", "item_group", "=", item_group])
 
-		if frappe.db.get_value("Item Group", item_group, "include_descendants"):
+		if get_item_group_tree().include_descendants(item_group):
 			# include child item group's items as well
 			# eg. Group Node A, will show items of child 1 and child 2 as well
 			# on it's web page
@@ -203,6 +373,19 @@ class ProductQuery:
 		Args:
 		        search_term (str): Search candidate
 		"""
+		from webshop.webshop.doctype.website_item.website_item import (
+			get_search_fulltext_condition,
+			get_search_fulltext_query,
+		)
+
+		fulltext_search = get_search_fulltext_query(search_term)
+		if fulltext_search:
+			# matched via the FULLTEXT index instead of scanning with LIKE,
+			# not queried at all if the search index answers the query
+			self.conditions.append(get_search_fulltext_condition())
+			self.condition_values["search"] = fulltext_search
+			return
+
 		# Default fields to search from
 		default_fields = {"item_code", "item_name", "web_long_description", "item_group"}
 
@@ -222,28 +405,37 @@ class ProductQuery:
 
 	def add_display_details(self, result, discount_list, cart_items):
 		"""Add price and availability details in result."""
-		for item in result:
-			product_info = get_product_info_for_website(item.item_code, skip_quotation_creation=True).get(
-				"product_info"
-			)
+		if not result:
+			return result, discount_list
 
-			if product_info and product_info["price"]:
-				# update/mutate item and discount_list objects
-				self.get_price_discount_info(item, product_info["price"], discount_list)
+		item_codes = [item.item_code for item in result]
+		price_map = get_prices_for_website(item_codes)
+		wished_items = self.get_wished_items(item_codes)
 
-			if self.settings.show_stock_availability:
-				self.get_stock_availability(item)
+		if self.settings.show_stock_availability:
+			self.get_stock_availability(result)
 
-			item.in_cart = item.item_code in cart_items
+		for item in result:
+			price = price_map.get(item.item_code)
+			if price:
+				# update/mutate item and discount_list objects
+				self.get_price_discount_info(item, price, discount_list)
 
-			item.wished = False
-			if frappe.db.exists(
-				"Wishlist Item", {"item_code": item.item_code, "parent": frappe.session.user}
-			):
-				item.wished = True
+			item.in_cart = item.item_code in cart_items
+			item.wished = item.item_code in wished_items
 
 		return result, discount_list
 
+	def get_wished_items(self, item_codes):
+		"""Return the subset of `item_codes` in the session user's wishlist."""
+		return set(
+			frappe.get_all(
+				"Wishlist Item",
+				filters={"item_code": ["in", item_codes], "parent": frappe.session.user},
+				pluck="item_code",
+			)
+		)
+
 	def get_price_discount_info(self, item, price_object, discount_list):
 		"""Modify item object and add price details."""
 		fields = ["formatted_mrp", "formatted_price", "price_list_rate"]
@@ -259,28 +451,170 @@ class ProductQuery:
 				"formatted_discount_rate"
 			)
 
-	def get_stock_availability(self, item):
-		"""Modify item object and add stock details."""
-		from webshop.templates.pages.wishlist import (
-			get_stock_availability as get_stock_availability_from_template,
+	def get_stock_availability(self, items):
+		"""Modify item objects and add stock details."""
+		is_stock_item_map = dict(
+			frappe.get_all(
+				"Item",
+				filters={"name": ["in", [item.item_code for item in items]]},
+				fields=["name", "is_stock_item"],
+				as_list=True,
+			)
 		)
 
-		item.in_stock = False
-		warehouse = item.get("website_warehouse")
-		is_stock_item = frappe.get_cached_value("Item", item.item_code, "is_stock_item")
+		stock_items, non_stock_items = {}, []
+		for item in items:
+			item.in_stock = False
+			warehouse = item.get("website_warehouse")
 
-		if item.get("on_backorder"):
-			return
+			if item.get("on_backorder"):
+				continue
 
-		if not is_stock_item:
-			if warehouse:
-				# product bundle case
-				item.in_stock = get_non_stock_item_status(item.item_code, "website_warehouse")
-			else:
-				item.in_stock = True
-		elif warehouse:
-			# stock item and has warehouse
-			item.in_stock = get_stock_availability_from_template(item.item_code, warehouse)
+			if not is_stock_item_map.get(item.item_code):
+				if warehouse:
+					# product bundle case
+					non_stock_items.append(item.item_code)
+				else:
+					item.in_stock = True
+			elif warehouse:
+				# stock item and has warehouse
+				stock_items[item.item_code] = warehouse
+
+		availability = get_items_stock_availability(stock_items) if stock_items else {}
+		if non_stock_items:
+			availability.update(
+				get_non_stock_items_status(non_stock_items, "website_warehouse", use_cache=True)
+			)
+
+		for item in items:
+			if item.item_code in availability:
+				item.in_stock = availability[item.item_code]
+
+	def get_facet_counts(self, fieldnames=None, attributes=None):
+		"""Count items per filter value over the current result set.
+		Each field or attribute is counted without its own filter, so that the counts
+		of its other values show what selecting them adds.
+		Call after `query` so that all applied filters are considered.
+
+		Args:
+		        fieldnames (list, optional): Website Item Link and Table MultiSelect fields
+		                to count values of
+		        attributes (list, optional): Item Attributes to count values of
+
+		Returns:
+		        dict: {"fields": {fieldname: {value: count}}, "attributes": {attribute: {value: count}}}
+		"""
+		if self.attributes:
+			# attribute filters are not applied yet if the page was queried from the index
+			self.build_attribute_filters()
+
+		meta = frappe.get_meta("Website Item", cached=True)
+		fieldnames = [
+			fieldname
+			for fieldname in (fieldnames or [])
+			if meta.has_field(fieldname)
+			and meta.get_field(fieldname).fieldtype in ("Link", "Table MultiSelect")
+		]
+
+		facet_counts = {"fields": {fieldname: {} for fieldname in fieldnames}, "attributes": {}}
+		if fieldnames:
+			# one grouped query per field, counted without the field's own filter
+			queries = [
+				self.get_field_counts_query(meta.get_field(fieldname)) for fieldname in fieldnames
+			]
+			field_counts = frappe.db.sql(  # nosemgrep
+				" union all ".join(queries), self.condition_values
+			)
+
+			for fieldname, value, count in field_counts:
+				if value:
+					facet_counts["fields"][fieldname][value] = count
+
+		if attributes:
+			# filtered attributes are counted without their own filter, one query each
+			filtered = [attribute for attribute in attributes if attribute in (self.attributes or {})]
+			others = [attribute for attribute in attributes if attribute not in filtered]
+
+			queries, values = [], dict(self.condition_values)
+			if others:
+				queries.append(self.get_attribute_counts_query("attribute in %(attributes)s"))
+				values["attributes"] = others
+
+			for index, attribute in enumerate(filtered):
+				queries.append(
+					self.get_attribute_counts_query(
+						f"attribute = %(attribute_{index})s",
+						self.get_filters_without_attribute(attribute),
+					)
+				)
+				values[f"attribute_{index}"] = attribute
+
+			attribute_counts = frappe.db.sql(" union all ".join(queries), values)  # nosemgrep
+
+			for attribute, attribute_value, count in attribute_counts:
+				facet_counts["attributes"].setdefault(attribute, {})[attribute_value] = count
+
+		return facet_counts
+
+	def get_field_counts_query(self, df):
+		"""SQL counting items per value of field `df` over the items matching all filters but
+		the field's own. Table MultiSelect values are counted through their child table."""
+		fieldname = df.fieldname
+		filters = self.get_filters_without(self.field_filters.get(fieldname))
+
+		if df.fieldtype == "Link":
+			return (
+				self.get_items_query(
+					"{0} as fieldname, `tabWebsite Item`.`{1}` as value, count(*) as count".format(
+						frappe.db.escape(fieldname), fieldname
+					),
+					filters,
+				)
+				+ f" group by `tabWebsite Item`.`{fieldname}`"
+			)
+
+		child_doctype = df.options
+		link_field = frappe.get_meta(child_doctype, cached=True).get("fields")[0].fieldname
+		return """
+			select {fieldname} as fieldname, `{link_field}` as value, count(distinct parent) as count
+			from `tab{child_doctype}`
+			where parenttype = 'Website Item'
+				and parentfield = {fieldname}
+				and parent in ({items_query})
+			group by `{link_field}`""".format(
+			fieldname=frappe.db.escape(fieldname),
+			link_field=link_field,
+			child_doctype=child_doctype,
+			items_query=self.get_items_query("`tabWebsite Item`.name", filters),
+		)
+
+	def get_attribute_counts_query(self, attribute_condition, filters=None):
+		"""SQL counting items per attribute value over the items matching `filters`."""
+		return """
+			select attribute, attribute_value, count(distinct parent)
+			from `tabItem Variant Attribute`
+			where parenttype = 'Item'
+				and {attribute_condition}
+				and ifnull(attribute_value, '') != ''
+				and parent in ({items_query})
+			group by attribute, attribute_value""".format(
+			attribute_condition=attribute_condition,
+			items_query=self.get_items_query("`tabWebsite Item`.item_code", filters),
+		)
+
+	def get_filters_without(self, excluded_filter):
+		return [f for f in self.filters if f is not excluded_filter]
+
+	def get_filters_without_attribute(self, attribute):
+		"""Filters with the attribute filters of all attributes but `attribute`."""
+		filters = self.get_filters_without(self.attribute_filter)
+
+		other_attributes = {key: value for key, value in self.attributes.items() if key != attribute}
+		if other_attributes:
+			item_codes = ItemAttributeIndex().get_item_codes(other_attributes)
+			filters.append(["item_code", "in", item_codes])
+
+		return filters
 
 	def get_cart_items(self):
 		customer = get_customer(silent=True)
@@ -305,19 +639,3 @@ class ProductQuery:
 				return items
 
 		return []
-
-	def filter_results_by_discount(self, fields, result):
-		if fields and fields.get("discount"):
-			discount_percent = frappe.utils.flt(fields["discount"][0])
-			result = [
-				row
-				for row in result
-				if row.get("discount_percent") and row.discount_percent <= discount_percent
-			]
-
-		if self.filter_with_discount:
-			# no limit was added to results while querying
-			# slice results manually
-			result[: self.page_length]
-
-		return result
@@ -0,0 +1,58 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import unittest
+
+import frappe
+
+from webshop.webshop.product_data_engine.attribute_index import (
+	ATTRIBUTE_INDEX_BUILT_KEY,
+	ItemAttributeIndex,
+)
+from webshop.webshop.product_data_engine.test_product_data_engine import create_variant_web_item
+from webshop.webshop.utils.cache import make_key, redis
+
+test_dependencies = ["Item"]
+
+
+class TestItemAttributeIndex(unittest.TestCase):
+	def setUp(self):
+		create_variant_web_item()
+		ItemAttributeIndex().clear()
+
+	def tearDown(self):
+		frappe.db.rollback()
+		ItemAttributeIndex().clear()
+
+	def test_attribute_index_build(self):
+		"Test if an attribute is indexed on first use and then read from the index."
+		index = ItemAttributeIndex()
+
+		self.assertIn("Test Web Item-L", index.get_item_codes({"Test Size": ["Large"]}))
+		self.assertTrue(redis().sismember(make_key(ATTRIBUTE_INDEX_BUILT_KEY), "Test Size"))
+
+		# answered from the value sets now
+		self.assertIn("Test Web Item-L", index.get_item_codes({"Test Size": "Large"}))
+		self.assertNotIn("Test Web Item-L", index.get_item_codes({"Test Size": ["Small"]}))
+		self.assertEqual(index.get_item_codes({}), [])
+
+	def test_attribute_index_item_update(self):
+		"Test if an item moves between value sets on attribute value change and unpublishing."
+		index = ItemAttributeIndex()
+		index.get_item_codes({"Test Size": ["Large"]})  # build
+
+		frappe.db.set_value(
+			"Item Variant Attribute",
+			{"parent": "Test Web Item-L", "attribute": "Test Size"},
+			"attribute_value",
+			"Small",
+		)
+		index.update_item("Test Web Item-L", [("Test Size", "Large")])
+
+		self.assertNotIn("Test Web Item-L", index.get_item_codes({"Test Size": ["Large"]}))
+		self.assertIn("Test Web Item-L", index.get_item_codes({"Test Size": ["Small", "Large"]}))
+
+		frappe.db.set_value("Item", "Test Web Item-L", "published_in_website", 0)
+		index.update_item("Test Web Item-L")
+
+		self.assertNotIn("Test Web Item-L", index.get_item_codes({"Test Size": ["Small", "Large"]}))
@@ -6,6 +6,7 @@ import unittest
 import frappe
 
 from webshop.webshop.api import get_product_filter_data
+from webshop.webshop.doctype.override_doctype.item_group import clear_item_group_tree
 from webshop.webshop.doctype.website_item.test_website_item import create_regular_web_item
 
 test_dependencies = ["Item", "Item Group"]
@@ -30,16 +31,20 @@ class TestItemGroupProductDataEngine(unittest.TestCase):
 
 		frappe.db.set_value("Item Group", "_Test Item Group B - 1", "show_in_website", 1)
 		frappe.db.set_value("Item Group", "_Test Item Group B - 2", "show_in_website", 1)
+		clear_item_group_tree()
 
 		frappe.db.set_single_value("Webshop Settings", "products_per_page", 10)
 
 	def tearDown(self):
 		frappe.db.rollback()
+		# the tree snapshot still has the rolled back values
+		clear_item_group_tree()
 
 	def test_product_listing_in_item_group(self):
 		"Test if only products belonging to the Item Group are fetched."
 
 		frappe.db.set_value("Item Group", "_Test Item Group B", "include_descendants", 0)
+		clear_item_group_tree()
 		result = get_product_filter_data(
 			query_args={
 				"field_filters": {},
@@ -98,6 +103,7 @@ class TestItemGroupProductDataEngine(unittest.TestCase):
 	def test_item_group_with_sub_groups(self):
 		"Test Valid Sub Item Groups in Item Group Page."
 		frappe.db.set_value("Item Group", "_Test Item Group B - 2", "show_in_website", 0)
+		clear_item_group_tree()
 
 		result = get_product_filter_data(
 			query_args={
@@ -115,6 +121,7 @@ class TestItemGroupProductDataEngine(unittest.TestCase):
 		self.assertIn("_Test Item Group B - 1", child_groups)
 
 		frappe.db.set_value("Item Group", "_Test Item Group B - 2", "show_in_website", 1)
+		clear_item_group_tree()
 		result = get_product_filter_data(
 			query_args={
 				"field_filters": {},
@@ -155,6 +162,7 @@ class TestItemGroupProductDataEngine(unittest.TestCase):
 
 		# enable 'include descendants' in Level 1
 		frappe.db.set_value("Item Group", "_Test Item Group B", "include_descendants", 1)
+		clear_item_group_tree()
 
 		result = get_product_filter_data(
 			query_args={
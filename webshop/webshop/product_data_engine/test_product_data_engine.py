@@ -208,6 +208,9 @@ class TestProductDataEngine(unittest.TestCase):
 			make_web_item_price,
 			make_web_pricing_rule,
 		)
+		from webshop.webshop.doctype.website_item_discount.website_item_discount import (
+			refresh_website_item_discounts,
+		)
 
 		field_filters = {"discount": [10]}
 
@@ -227,6 +230,12 @@ class TestProductDataEngine(unittest.TestCase):
 
 		setup_webshop_settings({"show_price": 1})
 		frappe.local.shopping_cart_settings = None
+		refresh_website_item_discounts(["Test 12I Laptop", "Test 13I Laptop"])
+		# refreshing again replaces the discount rows
+		refresh_website_item_discounts(["Test 12I Laptop"])
+
+		web_item = frappe.db.get_value("Website Item", {"item_code": "Test 12I Laptop"})
+		self.assertEqual(frappe.db.count("Website Item Discount", {"website_item": web_item}), 1)
 
 		engine = ProductQuery()
 		result = engine.query(
@@ -237,6 +246,30 @@ class TestProductDataEngine(unittest.TestCase):
 		# check if only product with 10% and below discount are fetched
 		self.assertEqual(len(items), 1)
 		self.assertEqual(items[0].get("item_code"), "Test 12I Laptop")
+		self.assertEqual(result.get("items_count"), 1)
+
+	def test_product_list_display_details(self):
+		"Test if price and wishlist details are attached to every listed item."
+		from webshop.webshop.doctype.website_item.test_website_item import make_web_item_price
+		from webshop.webshop.doctype.wishlist.wishlist import add_to_wishlist
+
+		make_web_item_price(item_code="Test 17I Laptop", price_list_rate=2000)
+		add_to_wishlist("Test 16I Laptop")
+
+		setup_webshop_settings({"show_price": 1})
+		frappe.local.shopping_cart_settings = None
+
+		engine = ProductQuery()
+		result = engine.query(attributes={}, fields={}, search_term=None, start=0, item_group=None)
+		items = {item.item_code: item for item in result.get("items")}
+
+		self.assertEqual(items["Test 17I Laptop"].price_list_rate, 2000)
+		self.assertTrue(items["Test 17I Laptop"].formatted_price)
+		self.assertTrue(items["Test 16I Laptop"].wished)
+		self.assertFalse(items["Test 17I Laptop"].wished)
+
+		# tear down
+		frappe.get_doc("Wishlist", {"user": frappe.session.user}).delete()
 
 	def test_product_list_with_api(self):
 		"Test products listing using API."
@@ -257,6 +290,76 @@ class TestProductDataEngine(unittest.TestCase):
 		self.assertEqual(len(items), 1)
 		self.assertEqual(items[0].get("item_code"), "Test Web Item-L")
 
+	def test_product_list_from_search_index(self):
+		"Test if the listing is queried from the RediSearch index when enabled."
+		from unittest.mock import patch
+
+		names = [
+			frappe.db.get_value("Website Item", {"item_code": item_code})
+			for item_code in ("Test 17I Laptop", "Test 12I Laptop")
+		]
+
+		with patch(
+			"webshop.webshop.product_data_engine.query.is_redisearch_enabled", return_value=True
+		), patch(
+			"webshop.webshop.product_data_engine.query.is_ranking_sortable", return_value=True
+		), patch(
+			"webshop.webshop.product_data_engine.query.search_web_item_names",
+			return_value=(names, 2),
+		) as search_web_item_names:
+			result = ProductQuery().query(
+				attributes={}, fields={}, search_term="laptop", start=0, item_group="Products"
+			)
+
+		query_string = search_web_item_names.call_args[0][0]
+		self.assertIn("@item_groups:{Products}", query_string)
+		self.assertIn("laptop*", query_string)
+
+		# page is read from the DB in the (ranking) order returned by the index
+		items = result.get("items")
+		self.assertEqual([item.item_code for item in items], ["Test 17I Laptop", "Test 12I Laptop"])
+		self.assertEqual(result.get("items_count"), 2)
+
+	def test_product_list_facet_counts(self):
+		"Test if item counts per filter value are returned for the current results."
+		from webshop.webshop.api import get_product_filter_data
+
+		create_variant_web_item()
+
+		result = get_product_filter_data(
+			query_args={
+				"field_filters": {"item_group": "Raw Material"},
+				"start": 0,
+				"with_facet_counts": 1,
+			}
+		)
+		facet_counts = result["filters"]["facet_counts"]
+
+		# a field is counted without its own filter, other item groups are listed too
+		self.assertEqual(facet_counts["fields"]["item_group"]["Raw Material"], 3)
+		self.assertGreaterEqual(facet_counts["fields"]["item_group"]["Products"], 4)
+		self.assertNotIn("Test Size", facet_counts["attributes"])
+
+		result = get_product_filter_data(
+			query_args={"field_filters": {"item_group": "Products"}, "with_facet_counts": 1}
+		)
+		facet_counts = result["filters"]["facet_counts"]
+
+		self.assertEqual(facet_counts["attributes"]["Test Size"]["Large"], 1)
+
+		result = get_product_filter_data(
+			query_args={
+				"field_filters": {"item_group": "Raw Material"},
+				"attribute_filters": {"Test Size": ["Large"]},
+				"with_facet_counts": 1,
+			}
+		)
+		facet_counts = result["filters"]["facet_counts"]
+
+		# the attribute filter applies to field counts, but not to its own counts
+		self.assertNotIn("Raw Material", facet_counts["fields"]["item_group"])
+		self.assertNotIn("Test Size", facet_counts["attributes"])
+
 	def test_product_list_with_variants(self):
 		"Test if variants are hideen on hiding variants in settings."
 		create_variant_web_item()
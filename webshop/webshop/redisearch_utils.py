@@ -2,26 +2,57 @@
 # License: GNU General Public License v3. See license.txt
 
 import json
+import re
+import time
 
 import frappe
 from frappe import _
-from frappe.utils.redis_wrapper import RedisWrapper
+from frappe.utils import cint, cstr, flt
 from redis import ResponseError
-from redis.commands.search.field import TagField, TextField
+from redis.commands.search.field import NumericField, TagField, TextField
 from redis.commands.search.indexDefinition import IndexDefinition
+from redis.commands.search.query import Query
 from redis.commands.search.suggestion import Suggestion
 
+from webshop.webshop.utils.cache import make_key, redis
+
 WEBSITE_ITEM_INDEX = "website_items_index"
 WEBSITE_ITEM_KEY_PREFIX = "website_item:"
 WEBSITE_ITEM_NAME_AUTOCOMPLETE = "website_items_name_dict"
 WEBSITE_ITEM_CATEGORY_AUTOCOMPLETE = "website_items_category_dict"
+INDEX_VERSION_KEY = "website_items_index_version"
+INDEX_BUILD_VERSION_KEY = "website_items_index_build_version"
+# seconds after which the build version of a killed rebuild expires, longer than the
+# timeout of jobs in the long queue
+INDEX_BUILD_VERSION_TTL = 2 * 60 * 60
+# set of Website Items names to sync to the index
+INDEX_QUEUE_KEY = "website_items_index_queue"
+# queued names being synced, removed once written to the index
+INDEX_STAGING_KEY = "website_items_index_staging"
+
+# seconds for which redisearch availability is cached in a process
+REDISEARCH_STATUS_TTL = 30
+
+# {site: {probe: (value, expires at)}}
+_redisearch_status = {}
+
+# Website Item field types and how they are indexed
+TAG_FIELD_TYPES = ("Link", "Dynamic Link", "Select", "Table MultiSelect")
+NUMERIC_FIELD_TYPES = ("Int", "Float", "Currency", "Percent")
+TEXT_FIELD_TYPES = ("Data", "Small Text", "Text", "Text Editor")
+
+# relevance of matches per text field, defaults to 1
+TEXT_FIELD_WEIGHTS = {"web_item_name": 5.0, "item_name": 3.0, "item_code": 3.0}
+
+# derived from related records, always indexed to filter listings
+COMPUTED_INDEX_FIELDS = ("item_groups", "attributes", "is_variant")
 
 
 def get_indexable_web_fields():
 	"Return valid fields from Website Item that can be searched for."
 	web_item_meta = frappe.get_meta("Website Item", cached=True)
 	valid_fields = filter(
-		lambda df: df.fieldtype in ("Link", "Table MultiSelect", "Data", "Small Text", "Text Editor"),
+		lambda df: df.fieldtype in TAG_FIELD_TYPES + NUMERIC_FIELD_TYPES + TEXT_FIELD_TYPES,
 		web_item_meta.fields,
 	)
 
@@ -30,11 +61,19 @@ def get_indexable_web_fields():
 
 def is_redisearch_enabled():
 	"Return True only if redisearch is loaded and enabled."
+	return get_redisearch_status("enabled", _is_redisearch_enabled)
+
+
+def _is_redisearch_enabled():
 	is_redisearch_enabled = frappe.db.get_single_value("Webshop Settings", "is_redisearch_enabled")
-	return is_search_module_loaded() and is_redisearch_enabled
+	return bool(is_search_module_loaded() and is_redisearch_enabled)
 
 
 def is_search_module_loaded():
+	return get_redisearch_status("module_loaded", _is_search_module_loaded)
+
+
+def _is_search_module_loaded():
 	try:
 		cache = frappe.cache()
 		for module in cache.module_list():
@@ -43,6 +82,53 @@ def is_search_module_loaded():
 	except Exception:
 		return False  # handling older redis versions
 
+	return False
+
+
+def get_redisearch_status(probe, generator):
+	"""Return the result of a capability probe, cached in the process for a few seconds
+	as it is checked by every search and index update."""
+	site_status = _redisearch_status.setdefault(frappe.local.site, {})
+	value, expires_at = site_status.get(probe, (None, 0))
+
+	if time.monotonic() >= expires_at:
+		value = generator()
+		site_status[probe] = (value, time.monotonic() + REDISEARCH_STATUS_TTL)
+
+	return value
+
+
+def is_ranking_sortable():
+	"""Return True if the live index has `ranking` as a NUMERIC field.
+	Indexes built before the schema was typed have it as TEXT, which sorts lexically."""
+	return get_redisearch_status("ranking_sortable", _is_ranking_sortable)
+
+
+def _is_ranking_sortable():
+	try:
+		info = frappe.cache().ft(WEBSITE_ITEM_INDEX).info()
+	except ResponseError:
+		return False  # index does not exist
+
+	return get_info_field_types(info).get("ranking") == "NUMERIC"
+
+
+def get_info_field_types(info):
+	"Return {fieldname: field type} from the FT.INFO reply of an index."
+	field_types = {}
+	for attribute in info.get("attributes") or []:
+		attribute = [frappe.safe_decode(value) for value in attribute]
+		field_types[attribute[attribute.index("attribute") + 1]] = attribute[
+			attribute.index("type") + 1
+		]
+
+	return field_types
+
+
+def clear_redisearch_status():
+	"""Probe again on next use. Only clears this process, others follow within the TTL."""
+	_redisearch_status.pop(frappe.local.site, None)
+
 
 def if_redisearch_enabled(function):
 	"Decorator to check if Redisearch is enabled."
@@ -56,109 +142,370 @@ def if_redisearch_enabled(function):
 	return wrapper
 
 
-def make_key(key):
-	return frappe.cache().make_key(key)
-
-
 @if_redisearch_enabled
 def create_website_items_index():
-	"Creates Index Definition."
+	"""
+	Build a new generation of the index and switch to it atomically.
 
-	redis = frappe.cache()
-	index = redis.ft(WEBSITE_ITEM_INDEX)
+	Each generation has its own index name and key prefix. Searches go through
+	the `WEBSITE_ITEM_INDEX` alias, which is only moved to the new index once it
+	is fully populated. The previous index and its keys are dropped afterwards.
+	"""
+	cache = frappe.cache()
+	old_version = get_index_version()
+	version = frappe.generate_hash(length=8)
+	index_name = get_index_name(version)
+	key_prefix = get_index_key_prefix(version)
+
+	# generations left behind by killed rebuilds
+	drop_stale_indexes(old_version)
+
+	# item updates during the rebuild are written to the new generation as well
+	cache.set_value(INDEX_BUILD_VERSION_KEY, version, expires_in_sec=INDEX_BUILD_VERSION_TTL)
 
 	try:
-		index.dropindex()  # drop if already exists
-	except ResponseError:
-		# will most likely raise a ResponseError if index does not exist
-		# ignore and create index
-		pass
+		index = cache.ft(index_name)
+		index.create_index(
+			get_index_fields(),
+			definition=IndexDefinition([make_key(key_prefix)]),
+		)
+		reindex_all_web_items(key_prefix)
+
+		if not old_version:
+			# index created before generations were introduced (not an alias)
+			drop_index(WEBSITE_ITEM_INDEX)
+
+		# `cache.ft` prefixes index names with the site key, the alias needs the same
+		alias = make_key(WEBSITE_ITEM_INDEX)
+		try:
+			index.aliasupdate(alias)
+		except ResponseError:
+			index.aliasadd(alias)
 	except Exception:
+		drop_index(index_name)
+		cache.delete_value(INDEX_BUILD_VERSION_KEY)
 		raise_redisearch_error()
 
-	idx_def = IndexDefinition([make_key(WEBSITE_ITEM_KEY_PREFIX)])
+	cache.set_value(INDEX_VERSION_KEY, version)
+	cache.delete_value(INDEX_BUILD_VERSION_KEY)
+
+	if old_version:
+		drop_index(get_index_name(old_version))
+
+	define_autocomplete_dictionary()
 
+
+def drop_stale_indexes(live_version):
+	"Drop all index generations but the live one, along with their documents."
+	prefix = frappe.safe_decode(make_key(get_index_name("")))
+	for index_name in frappe.cache().execute_command("FT._LIST"):
+		index_name = frappe.safe_decode(index_name)
+		version = index_name[len(prefix) :]
+		if index_name.startswith(prefix) and version != live_version:
+			drop_index(get_index_name(version))
+
+
+def drop_index(index_name):
+	"Drop index along with its documents, if it exists."
+	try:
+		frappe.cache().ft(index_name).dropindex(delete_documents=True)
+	except ResponseError:
+		# index does not exist
+		pass
+
+
+def get_index_fields():
 	# Index fields mentioned in webshop settings
 	idx_fields = frappe.db.get_single_value("Webshop Settings", "search_index_fields")
 	idx_fields = idx_fields.split(",") if idx_fields else []
 
-	if "web_item_name" in idx_fields:
-		idx_fields.remove("web_item_name")
+	# always indexed, ranking to sort search results by it
+	mandatory_fields = ["web_item_name", "ranking", *COMPUTED_INDEX_FIELDS]
+	idx_fields = [to_search_field(f) for f in idx_fields if f not in mandatory_fields]
 
-	idx_fields = [to_search_field(f) for f in idx_fields]
+	return [
+		TextField("web_item_name", weight=TEXT_FIELD_WEIGHTS["web_item_name"], sortable=True),
+		NumericField("ranking", sortable=True),
+		# own item group and website item groups
+		TagField("item_groups", separator=","),
+		# variant attributes as "attribute:value"
+		TagField("attributes", separator=","),
+		NumericField("is_variant"),
+	] + idx_fields
 
-	# TODO: sortable?
-	index.create_index(
-		[TextField("web_item_name", sortable=True)] + idx_fields,
-		definition=idx_def,
-	)
 
-	reindex_all_web_items()
-	define_autocomplete_dictionary()
+def get_index_version():
+	"Return the generation of the index the alias points to."
+	return frappe.cache().get_value(INDEX_VERSION_KEY)
+
+
+def get_index_name(version):
+	return f"{WEBSITE_ITEM_INDEX}_{version}"
+
+
+def get_index_key_prefix(version=None):
+	if not version:
+		return WEBSITE_ITEM_KEY_PREFIX
+
+	# must not share the legacy prefix, else the legacy index would pick these keys up
+	return f"website_item_{version}:"
+
+
+def get_index_key_prefixes():
+	"Key prefixes to write items to: the live generation and one being built."
+	cache = frappe.cache()
+	versions = [get_index_version(), cache.get_value(INDEX_BUILD_VERSION_KEY)]
+
+	prefixes = []
+	for version in versions:
+		prefix = get_index_key_prefix(version)
+		if prefix not in prefixes:
+			prefixes.append(prefix)
+
+	return prefixes
 
 
 def to_search_field(field):
+	"Map a Website Item field to a search field as per its field type."
 	if field == "tags":
 		return TagField("tags", separator=",")
 
-	return TextField(field)
+	fieldtype = get_index_fieldtype(field)
 
+	if fieldtype in TAG_FIELD_TYPES:
+		return TagField(field, separator=",")
 
-@if_redisearch_enabled
-def insert_item_to_index(website_item_doc):
-	# Insert item to index
-	key = get_cache_key(website_item_doc.name)
-	cache = frappe.cache()
-	web_item = create_web_item_map(website_item_doc)
+	if fieldtype in NUMERIC_FIELD_TYPES:
+		return NumericField(field, sortable=True)
 
-	for field, value in web_item.items():
-		super(RedisWrapper, cache).hset(make_key(key), field, value)
+	return TextField(field, weight=TEXT_FIELD_WEIGHTS.get(field, 1.0))
 
-	insert_to_name_ac(website_item_doc.web_item_name, website_item_doc.name)
 
+def get_index_field_types():
+	"Return {fieldname: field type} of the fields in the index, eg. {'brand': 'TAG'}."
+	return {field.name: field.args[0] for field in get_index_fields()}
 
-@if_redisearch_enabled
-def insert_to_name_ac(web_name, doc_name):
-	ac = frappe.cache().ft()
-	ac.sugadd(WEBSITE_ITEM_NAME_AUTOCOMPLETE, Suggestion(web_name, payload=doc_name))
+
+def get_index_fieldtype(field):
+	df = frappe.get_meta("Website Item", cached=True).get_field(field)
+	return df.fieldtype if df else None
 
 
-def create_web_item_map(website_item_doc):
-	fields_to_index = get_fields_indexed()
-	web_item = {}
+def create_web_item_map(website_item_doc, fields_to_index=None, computed_fields=None):
+	fields_to_index = fields_to_index or get_fields_indexed()
+	if computed_fields is None:
+		computed_fields = get_computed_index_fields([website_item_doc])[website_item_doc.name]
+
+	web_item = dict(computed_fields)
 
 	for field in fields_to_index:
-		web_item[field] = website_item_doc.get(field) or ""
+		value = website_item_doc.get(field)
+		fieldtype = get_index_fieldtype(field)
+
+		if fieldtype in NUMERIC_FIELD_TYPES:
+			# numeric fields must hold numbers to be indexed
+			value = flt(value)
+		elif fieldtype == "Table MultiSelect":
+			value = ",".join(get_table_multiselect_values(field, value))
+
+		web_item[field] = value if value is not None else ""
 
 	return web_item
 
 
+def get_computed_index_fields(web_items):
+	"""Return {website item name: computed fields} for `web_items` in two queries.
+
+	`web_items` need `name`, `item_code`, `item_group` and `variant_of`.
+	"""
+	names = [item.name for item in web_items]
+	item_codes = [item.item_code for item in web_items]
+
+	item_groups = {item.name: [item.item_group] if item.item_group else [] for item in web_items}
+	website_item_groups = frappe.get_all(
+		"Website Item Group",
+		filters={"parent": ["in", names], "parenttype": "Website Item"},
+		fields=["parent", "item_group"],
+	)
+	for row in website_item_groups:
+		if row.item_group and row.item_group not in item_groups[row.parent]:
+			item_groups[row.parent].append(row.item_group)
+
+	attributes = {}
+	item_attributes = frappe.get_all(
+		"Item Variant Attribute",
+		filters={"parent": ["in", item_codes], "parenttype": "Item"},
+		fields=["parent", "attribute", "attribute_value"],
+	)
+	for row in item_attributes:
+		if row.attribute_value:
+			attributes.setdefault(row.parent, []).append(
+				get_attribute_tag(row.attribute, row.attribute_value)
+			)
+
+	return {
+		item.name: {
+			"item_groups": ",".join(item_groups[item.name]),
+			"attributes": ",".join(attributes.get(item.item_code, [])),
+			"is_variant": 1 if item.variant_of else 0,
+		}
+		for item in web_items
+	}
+
+
+def get_attribute_tag(attribute, attribute_value):
+	return f"{attribute}:{attribute_value}"
+
+
+def get_tag_condition(field, values):
+	"Return a query condition matching any of `values` in tag field `field`."
+	return "@{0}:{{{1}}}".format(field, " | ".join(escape_tag_value(value) for value in values))
+
+
+def escape_tag_value(value):
+	# punctuation and spaces separate tokens in tag queries
+	return re.sub(r"([^\w])", r"\\\1", cstr(value))
+
+
+def search_web_item_names(query_string, start=0, page_length=20):
+	"""Return names of Website Items matching `query_string` in ranking order
+	and the total number of matches."""
+	results = frappe.cache().ft(WEBSITE_ITEM_INDEX).search(
+		Query(query_string)
+		.sort_by("ranking", asc=False)
+		.paging(cint(start), cint(page_length))
+		.return_fields("name")
+	)
+
+	return [doc.name for doc in results.docs], results.total
+
+
+def get_table_multiselect_values(field, rows):
+	"Return the link values of Table MultiSelect `rows`."
+	link_field = get_table_multiselect_link_field(field)
+	return [row.get(link_field) for row in (rows or []) if row.get(link_field)]
+
+
+def get_table_multiselect_link_field(field):
+	child_doctype = frappe.get_meta("Website Item", cached=True).get_field(field).options
+	child_fields = frappe.get_meta(child_doctype, cached=True).get("fields")
+	return child_fields[0].fieldname
+
+
 @if_redisearch_enabled
-def update_index_for_item(website_item_doc):
-	# Reinsert to Cache
-	insert_item_to_index(website_item_doc)
-	define_autocomplete_dictionary()
+def queue_index_update(website_item_doc, deleted=False):
+	"""
+	Sync a Website Item to the index once the transaction is committed.
+
+	Names are collected in a redis set, so that repeated saves of an item are
+	synced once. A background job drains the set in batches.
+	"""
+	doc_before_save = website_item_doc.get_doc_before_save()
+	old_web_item_name = doc_before_save.web_item_name if doc_before_save else None
+
+	def queue():
+		# suggestions are removed by name, the synced item can't tell its old name
+		if deleted or not website_item_doc.published:
+			delete_from_ac_dict(website_item_doc)
+		if old_web_item_name and old_web_item_name != website_item_doc.web_item_name:
+			delete_from_ac_dict(website_item_doc, old_web_item_name)
+
+		add_to_index_queue([website_item_doc.name])
+
+	frappe.db.after_commit.add(queue)
 
 
 @if_redisearch_enabled
-def delete_item_from_index(website_item_doc):
+def queue_index_sync(names):
+	"Sync Website Items `names` to the index once the transaction is committed."
+	if not (names and is_redisearch_enabled()):
+		return
+
+	frappe.db.after_commit.add(lambda: add_to_index_queue(names))
+
+
+def add_to_index_queue(names):
+	frappe.cache().sadd(INDEX_QUEUE_KEY, *names)
+	frappe.enqueue(
+		"webshop.webshop.redisearch_utils.sync_index_queue",
+		queue="short",
+		job_id="sync_website_items_index_queue",
+		deduplicate=True,
+	)
+
+
+@if_redisearch_enabled
+def sync_index_queue(batch_size=500):
+	"""
+	Sync queued Website Items to the index, `batch_size` items at a time.
+
+	The queue is moved to a staging set as a whole and names are removed from it only
+	once written, so a failed sync is retried by the next run. Names queued meanwhile
+	wait in the queue for the next round.
+	"""
+	client = redis()
+	queue_key, staging_key = make_key(INDEX_QUEUE_KEY), make_key(INDEX_STAGING_KEY)
+
+	while True:
+		names = client.srandmember(staging_key, batch_size)
+		if not names:
+			try:
+				# no-op if another worker staged the queue meanwhile
+				client.renamenx(queue_key, staging_key)
+			except ResponseError:
+				break  # nothing queued
+
+			continue
+
+		sync_web_items([frappe.safe_decode(name) for name in names])
+		client.srem(staging_key, *names)
+
+
+def sync_web_items(names):
+	"Write published Website Items among `names` to the index and remove the rest."
 	cache = frappe.cache()
-	key = get_cache_key(website_item_doc.name)
+	fields = get_fields_indexed()
+	key_prefixes = get_index_key_prefixes()
 
-	try:
-		cache.delete(key)
-	except Exception:
-		raise_redisearch_error()
+	items = frappe.get_all(
+		"Website Item",
+		fields=get_index_column_fields(fields),
+		filters={"name": ["in", names], "published": 1},
+	)
+
+	if items:
+		write_web_items(items, fields, key_prefixes)
 
-	delete_from_ac_dict(website_item_doc)
-	return True
+		ac = cache.ft()
+		suggestions = [Suggestion(item.web_item_name, payload=item.name) for item in items]
+		ac.sugadd(WEBSITE_ITEM_NAME_AUTOCOMPLETE, *suggestions)
+
+	# unpublished or deleted
+	published = {item.name for item in items}
+	keys = [
+		make_key(get_cache_key(name, key_prefix))
+		for name in names
+		if name not in published
+		for key_prefix in key_prefixes
+	]
+	if keys:
+		redis().delete(*keys)
 
 
 @if_redisearch_enabled
-def delete_from_ac_dict(website_item_doc):
+def delete_from_ac_dict(website_item_doc, web_item_name=None):
 	"""Removes this items's name from autocomplete dictionary"""
+	web_item_name = web_item_name or website_item_doc.web_item_name
+
+	# keep the suggestion if other published items share the name
+	if frappe.db.exists(
+		"Website Item",
+		{"web_item_name": web_item_name, "published": 1, "name": ["!=", website_item_doc.name]},
+	):
+		return
+
 	ac = frappe.cache().ft()
-	ac.sugdel(website_item_doc.web_item_name)
+	ac.sugdel(WEBSITE_ITEM_NAME_AUTOCOMPLETE, web_item_name)
 
 
 @if_redisearch_enabled
@@ -189,8 +536,11 @@ def create_items_autocomplete_dict():
 	items = frappe.get_all(
 		"Website Item", fields=["web_item_name", "item_group"], filters={"published": 1}
 	)
-	for item in items:
-		ac.sugadd(WEBSITE_ITEM_NAME_AUTOCOMPLETE, Suggestion(item.web_item_name))
+
+	# sugadd pipelines multiple suggestions in one round trip
+	for start in range(0, len(items), 1000):
+		suggestions = [Suggestion(item.web_item_name) for item in items[start : start + 1000]]
+		ac.sugadd(WEBSITE_ITEM_NAME_AUTOCOMPLETE, *suggestions)
 
 
 @if_redisearch_enabled
@@ -204,35 +554,143 @@ def create_item_groups_autocomplete_dict():
 		return
 
 	ac = frappe.cache().ft()
-
+	suggestions = []
 	for item_group in published_item_groups:
 		payload = json.dumps({"name": item_group.name, "route": item_group.route})
-		ac.sugadd(
-			WEBSITE_ITEM_CATEGORY_AUTOCOMPLETE,
+		suggestions.append(
 			Suggestion(
 				string=item_group.name,
 				score=frappe.utils.flt(item_group.weightage) or 1.0,
 				payload=payload,  # additional info that can be retrieved later
-			),
+			)
 		)
 
+	# sugadd pipelines multiple suggestions in one round trip
+	ac.sugadd(WEBSITE_ITEM_CATEGORY_AUTOCOMPLETE, *suggestions)
+
+
+@if_redisearch_enabled
+def update_item_group_in_ac_dict(item_group_doc, old_name=None, deleted=False):
+	"""Add/remove an Item Group from the category autocomplete dictionary."""
+	ac = frappe.cache().ft()
+
+	if old_name:
+		ac.sugdel(WEBSITE_ITEM_CATEGORY_AUTOCOMPLETE, old_name)
+
+	if deleted or not item_group_doc.show_in_website:
+		ac.sugdel(WEBSITE_ITEM_CATEGORY_AUTOCOMPLETE, item_group_doc.name)
+		return
+
+	payload = json.dumps({"name": item_group_doc.name, "route": item_group_doc.route})
+	ac.sugadd(
+		WEBSITE_ITEM_CATEGORY_AUTOCOMPLETE,
+		Suggestion(
+			string=item_group_doc.name,
+			score=frappe.utils.flt(item_group_doc.weightage) or 1.0,
+			payload=payload,
+		),
+	)
+
 
 @if_redisearch_enabled
-def reindex_all_web_items():
-	items = frappe.get_all("Website Item", fields=get_fields_indexed(), filters={"published": True})
+def reindex_all_web_items(key_prefix=WEBSITE_ITEM_KEY_PREFIX, chunk_size=1000):
+	"""
+	Write all published Website Items to redis under `key_prefix`.
 
-	cache = frappe.cache()
+	Items are streamed from the DB in chunks (ordered by name) and written with
+	one HSET per item, one pipeline per chunk. Progress is published after every chunk.
+	"""
+	fields = get_fields_indexed()
+	column_fields = get_index_column_fields(fields)
+	total = frappe.db.count("Website Item", {"published": 1})
+
+	last_name, indexed = "", 0
+	started_at = time.monotonic()
+
+	while True:
+		items = frappe.get_all(
+			"Website Item",
+			fields=column_fields,
+			filters={"published": 1, "name": [">", last_name]},
+			order_by="name asc",
+			limit_page_length=chunk_size,
+		)
+		if not items:
+			break
+
+		write_web_items(items, fields, [key_prefix])
+
+		last_name = items[-1].name
+		indexed += len(items)
+
+		throughput = indexed / max(time.monotonic() - started_at, 0.001)
+		frappe.publish_progress(
+			min(indexed * 100 / (total or 1), 100),
+			title=_("Indexing Website Items"),
+			description=_("{0} of {1} items indexed ({2} items/s)").format(
+				indexed, total, int(throughput)
+			),
+		)
+
+	return indexed
+
+
+def get_index_column_fields(fields):
+	"Return Website Item columns to fetch, to index `fields`."
+	column_fields = [f for f in fields if get_index_fieldtype(f) != "Table MultiSelect"]
+
+	# to compute item groups, attributes and variant flag
+	column_fields += [
+		f for f in ("item_code", "item_group", "variant_of") if f not in column_fields
+	]
+
+	return column_fields
+
+
+def write_web_items(items, fields, key_prefixes):
+	"""Write Website Items (fetched with `get_index_column_fields`) under each of `key_prefixes`,
+	with one HSET per item and key in a single pipeline."""
+	for field in fields:
+		if get_index_fieldtype(field) == "Table MultiSelect":
+			set_table_multiselect_rows(items, field)
+
+	computed_fields = get_computed_index_fields(items)
+
+	pipeline = frappe.cache().pipeline(transaction=False)
 	for item in items:
-		web_item = create_web_item_map(item)
-		key = make_key(get_cache_key(item.name))
+		web_item = create_web_item_map(item, fields, computed_fields[item.name])
+		for key_prefix in key_prefixes:
+			pipeline.hset(make_key(get_cache_key(item.name, key_prefix)), mapping=web_item)
+	pipeline.execute()
+
+
+def set_table_multiselect_rows(items, field):
+	"Fetch Table MultiSelect rows of `items` in one query and set them on each item."
+	child_doctype = frappe.get_meta("Website Item", cached=True).get_field(field).options
+	link_field = get_table_multiselect_link_field(field)
+
+	rows = frappe.get_all(
+		child_doctype,
+		filters={
+			"parent": ["in", [item.name for item in items]],
+			"parenttype": "Website Item",
+			"parentfield": field,
+		},
+		fields=["parent", link_field],
+		order_by="idx asc",
+	)
 
-		for field, value in web_item.items():
-			super(RedisWrapper, cache).hset(key, field, value)
+	rows_by_parent = {}
+	for row in rows:
+		rows_by_parent.setdefault(row.parent, []).append(row)
+
+	for item in items:
+		item[field] = rows_by_parent.get(item.name, [])
 
 
-def get_cache_key(name):
+def get_cache_key(name, key_prefix=WEBSITE_ITEM_KEY_PREFIX):
 	name = frappe.scrub(name)
-	return f"{WEBSITE_ITEM_KEY_PREFIX}{name}"
+	return f"{key_prefix}{name}"
 
 
 def get_fields_indexed():
@@ -9,7 +9,11 @@ from webshop.webshop.doctype.webshop_settings.webshop_settings import (
 )
 from webshop.webshop.shopping_cart.cart import _get_cart_quotation, _set_price_list
 from erpnext.utilities.product import (get_price)
-from webshop.webshop.utils.product import (get_non_stock_item_status, get_web_item_qty_in_stock)
+from webshop.webshop.utils.product import (
+    get_item_prices,
+    get_non_stock_item_status,
+    get_web_item_qty_in_stock,
+)
 from webshop.webshop.shopping_cart.cart import get_party
 
 
@@ -59,6 +63,7 @@ def get_product_info_for_website(item_code, skip_quotation_creation=False):
 		if on_backorder:
 			stock_status = frappe._dict({"on_backorder": True})
 		else:
+			# not cached: the stock shown here decides whether the item can be added to cart
 			stock_status = get_web_item_qty_in_stock(item_code, "website_warehouse")
 
 	product_info = {
@@ -91,6 +96,34 @@ def get_product_info_for_website(item_code, skip_quotation_creation=False):
 	return frappe._dict({"product_info": product_info, "cart_settings": cart_settings})
 
 
+def get_prices_for_website(item_codes):
+	"""
+	Get product prices for several items at once (eg. a listing page).
+	Returns a dict in the form {item_code: price object}.
+	"""
+	cart_settings = get_shopping_cart_settings()
+	if not (cart_settings.enabled and cart_settings.show_price):
+		return {}
+
+	is_guest = frappe.session.user == "Guest"
+	party = get_party()
+
+	# Show Price if logged in.
+	# If not logged in, check if price is hidden for guest.
+	if is_guest and cart_settings.hide_price_for_guest:
+		return {}
+
+	selling_price_list = _set_price_list(cart_settings, None)
+
+	return get_item_prices(
+		item_codes,
+		selling_price_list,
+		cart_settings.default_customer_group,
+		cart_settings.company,
+		party=party,
+	)
+
+
 def set_product_info_for_website(item):
 	"""set product price uom for website"""
 	product_info = get_product_info_for_website(
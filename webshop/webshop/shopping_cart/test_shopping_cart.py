@@ -14,9 +14,11 @@ from webshop.webshop.shopping_cart.cart import (
 	_get_cart_quotation,
 	get_cart_quotation,
 	get_party,
+	place_order,
 	request_for_quotation,
 	update_cart,
 )
+from webshop.webshop.utils.product import get_items_stock_availability
 from erpnext.tests.utils import create_test_contact_and_address
 
 
@@ -230,6 +232,43 @@ class TestShoppingCart(unittest.TestCase):
 
 		self.assertEqual(quote_doctstatus, 1)
 
+	@change_settings("Webshop Settings", {"allow_items_not_in_stock": 0})
+	def test_place_order_with_stale_stock_cache(self):
+		"Test if an order is rejected right after stock drops to 0, even if stock is cached."
+		from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+
+		frappe.db.set_value(
+			"Website Item", {"item_code": "_Test Item"}, "website_warehouse", "_Test Warehouse - _TC"
+		)
+		make_stock_entry(
+			item_code="_Test Item", target="_Test Warehouse - _TC", qty=1, basic_rate=100
+		)
+		# warm up the listing's stock cache
+		availability = get_items_stock_availability({"_Test Item": "_Test Warehouse - _TC"})
+		self.assertTrue(availability["_Test Item"])
+
+		# stock drops without any document event clearing the cache
+		frappe.db.set_value(
+			"Bin", {"item_code": "_Test Item", "warehouse": "_Test Warehouse - _TC"}, "actual_qty", 0
+		)
+
+		self.login_as_customer(
+			"test_contact_two_customer@example.com", "_Test Contact 2 For _Test Customer"
+		)
+		create_address_and_contact(
+			address_title="_Test Address for Customer 2",
+			first_name="_Test Contact for Customer 2",
+			email="test_contact_two_customer@example.com",
+			customer="_Test Customer 2",
+		)
+		self.clear_existing_quotations()
+		frappe.local.shopping_cart_settings = None
+
+		update_cart("_Test Item", 1)
+		get_cart_quotation()  # sets the billing address
+
+		self.assertRaises(frappe.ValidationError, place_order)
+
 	def create_tax_rule(self):
 		tax_rule = frappe.get_test_records("Tax Rule")[0]
 		try:
@@ -0,0 +1,22 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+import frappe
+from frappe.utils.redis_wrapper import RedisWrapper
+
+
+def redis():
+	"Redis client without pickling and local caching, for raw values, sets, flags and locks."
+	return super(RedisWrapper, frappe.cache())
+
+
+def make_key(key):
+	"Site specific key, as used by `frappe.cache()`."
+	return frappe.cache().make_key(key)
+
+
+def run_now_and_after_commit(function):
+	"""Run a cache update or invalidation now and again after commit, as other processes
+	could cache pre-commit values meanwhile."""
+	function()
+	frappe.db.after_commit.add(function)
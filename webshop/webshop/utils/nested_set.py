@@ -0,0 +1,106 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+from bisect import bisect_left
+
+import frappe
+
+from webshop.webshop.utils.cache import run_now_and_after_commit
+
+TREE_VERSION_KEY = "nested_set_tree_version"
+_trees = {}  # (site, doctype) -> (version, tree)
+
+
+class NestedSetTree:
+	"""Snapshot of a nested set tree for ancestor and descendant lookups without queries.
+
+	Subclasses set the `doctype`, its `parent_field` and the extra `fields` to load.
+	"""
+
+	doctype = None
+	parent_field = None
+	fields = []
+
+	def __init__(self):
+		nodes = frappe.get_all(
+			self.doctype,
+			fields=["name", self.parent_field, "lft", "rgt"] + list(self.fields),
+			order_by="lft asc",
+		)
+
+		self.nodes = {d.name: d for d in nodes}
+		self.order = [d.name for d in nodes]
+		self.lfts = [d.lft for d in nodes]
+		self.position = {name: index for index, name in enumerate(self.order)}
+
+		self.children = {}
+		self.ancestors = {}
+		for d in nodes:
+			parent = d.get(self.parent_field)
+			if parent:
+				self.children.setdefault(parent, []).append(d.name)
+
+			# parents come first in lft order
+			self.ancestors[d.name] = (
+				self.ancestors.get(parent, []) + [parent] if parent in self.nodes else []
+			)
+
+	def get_descendants(self, name, include_self=False):
+		"""Return descendants of `name` in lft order, preceded by `name` if `include_self`."""
+		if name not in self.nodes:
+			return []
+
+		# descendants are contiguous in lft order: lft < descendant lft < rgt
+		start = self.position[name]
+		end = bisect_left(self.lfts, self.nodes[name].rgt, lo=start + 1)
+		return self.order[start if include_self else start + 1 : end]
+
+	def get_ancestors(self, name, include_self=False):
+		"""Return ancestors of `name` from root downwards."""
+		if name not in self.nodes:
+			return []
+
+		ancestors = list(self.ancestors[name])
+		if include_self:
+			ancestors.append(name)
+
+		return ancestors
+
+
+def get_tree(tree_class):
+	"""
+	Return the process level snapshot of a `NestedSetTree` subclass' tree.
+	The snapshot is validated against a version stamp in redis (once per request)
+	that is renewed by `clear_tree`. Updates skipping hooks (eg. `db.set_value`) must
+	call `clear_tree` themselves.
+	"""
+	doctype = tree_class.doctype
+	request_trees = getattr(frappe.local, "nested_set_trees", None)
+	if request_trees is None:
+		request_trees = frappe.local.nested_set_trees = {}
+
+	if doctype in request_trees:
+		return request_trees[doctype]
+
+	version = frappe.cache().hget(TREE_VERSION_KEY, doctype)
+	if not version:
+		version = frappe.generate_hash(length=10)
+		frappe.cache().hset(TREE_VERSION_KEY, doctype, version)
+
+	cached_version, tree = _trees.get((frappe.local.site, doctype), (None, None))
+	if cached_version != version:
+		tree = tree_class()
+		_trees[(frappe.local.site, doctype)] = (version, tree)
+
+	request_trees[doctype] = tree
+	return tree
+
+
+def clear_tree(doctype):
+	"""Renew the version stamp of `doctype`'s tree, now and after commit."""
+
+	def renew_version():
+		frappe.cache().hset(TREE_VERSION_KEY, doctype, frappe.generate_hash(length=10))
+
+	getattr(frappe.local, "nested_set_trees", {}).pop(doctype, None)
+	run_now_and_after_commit(renew_version)
@@ -1,97 +1,590 @@
+import pickle
+
 import frappe
-from frappe.utils import getdate, nowdate
+from frappe.utils import cint, flt, fmt_money, nowdate
 
 from erpnext.stock.doctype.batch.batch import get_batch_qty
-from erpnext.stock.doctype.warehouse.warehouse import get_child_warehouses
+from webshop.webshop.utils.cache import redis, run_now_and_after_commit
+from webshop.webshop.utils.warehouse import get_warehouse_tree
+
+STOCK_QTY_CACHE_KEY = "website_stock_qty"
+# seconds for which stock qty of an item in a website warehouse is cached
+STOCK_QTY_CACHE_TTL = 10
+# {item_code: {warehouse: qty in expired batches}}, refreshed daily
+EXPIRED_BATCH_QTY_KEY = "website_expired_batch_qty"
+EXPIRED_BATCH_QTY_BUILT_ON = "__built_on"
+# {product bundle item code: [bundle item code, ...]}
+PRODUCT_BUNDLE_ITEMS_KEY = "website_product_bundle_items"
 
 
 def get_web_item_qty_in_stock(item_code, item_warehouse_field, warehouse=None):
-	in_stock, stock_qty = 0, ""
-	template_item_code, is_stock_item = frappe.db.get_value(
-		"Item", item_code, ["variant_of", "is_stock_item"]
+	return get_web_items_qty_in_stock([item_code], item_warehouse_field, warehouse)[item_code]
+
+
+def get_web_items_qty_in_stock(item_codes, item_warehouse_field, warehouse=None, use_cache=False):
+	"""
+	Batched stock qty of items in their website warehouses (or `warehouse`).
+	Warehouses, Bin quantities and expired batches are fetched once for all items.
+	:param use_cache: Read from the short-lived stock qty cache, only for listings and page renders
+	:returns: A dict in the form {item_code: {"in_stock": 0/1, "stock_qty": qty, "is_stock_item": 0/1}}
+	"""
+	item_codes = list(dict.fromkeys(item_codes))
+	item_map = {
+		item.name: item
+		for item in frappe.get_all(
+			"Item",
+			filters={"name": ["in", item_codes]},
+			fields=["name", "variant_of", "is_stock_item"],
+		)
+	}
+
+	item_warehouses = get_item_website_warehouses(
+		item_codes, item_map, item_warehouse_field, warehouse
 	)
+	if use_cache:
+		stock_qty_map = get_stock_qty_map(item_warehouses)
+	else:
+		stock_qty_map = compute_stock_qty_map(item_warehouses)
+
+	stock = {}
+	for item_code in item_codes:
+		in_stock, total_stock = 0, 0.0
 
-	if not warehouse:
-		warehouse = frappe.db.get_value("Website Item", {"item_code": item_code}, item_warehouse_field)
+		if item_code in stock_qty_map:
+			total_stock = stock_qty_map[item_code]
+			in_stock = total_stock > 0 and 1 or 0
 
-	if not warehouse and template_item_code and template_item_code != item_code:
-		warehouse = frappe.db.get_value(
-			"Website Item", {"item_code": template_item_code}, item_warehouse_field
+		stock[item_code] = frappe._dict(
+			{
+				"in_stock": in_stock,
+				"stock_qty": total_stock,
+				"is_stock_item": item_map[item_code].is_stock_item if item_code in item_map else None,
+			}
 		)
 
-	if warehouse and frappe.get_cached_value("Warehouse", warehouse, "is_group") == 1:
-		warehouses = get_child_warehouses(warehouse)
+	return stock
+
+
+def get_item_website_warehouses(item_codes, item_map, item_warehouse_field, warehouse=None):
+	"""
+	Resolve the warehouse of each item: `warehouse` if given, else the Website Item's
+	(or its template's) `item_warehouse_field`.
+	:returns: A dict in the form {item_code: warehouse}
+	"""
+	if warehouse:
+		return {item_code: warehouse for item_code in item_codes}
+
+	template_codes = {
+		item.variant_of for item in item_map.values() if item.variant_of and item.variant_of != item.name
+	}
+	web_item_warehouses = dict(
+		frappe.get_all(
+			"Website Item",
+			filters={"item_code": ["in", list(set(item_codes) | template_codes)]},
+			fields=["item_code", item_warehouse_field],
+			as_list=True,
+		)
+	)
+
+	item_warehouses = {}
+	for item_code in item_codes:
+		template_item_code = item_map[item_code].variant_of if item_code in item_map else None
+		item_warehouse = web_item_warehouses.get(item_code)
+
+		if not item_warehouse and template_item_code and template_item_code != item_code:
+			item_warehouse = web_item_warehouses.get(template_item_code)
+
+		if item_warehouse:
+			item_warehouses[item_code] = item_warehouse
+
+	return item_warehouses
+
+
+def get_stock_qty_map(item_warehouses):
+	"""
+	Stock qty of items in a warehouse (children included), in sales UOM and without
+	expired batches. Cached per item and warehouse for `STOCK_QTY_CACHE_TTL` seconds,
+	use `compute_stock_qty_map` where stock must be exact (cart, checkout).
+	:param item_warehouses: A dict in the form {item_code: warehouse}
+	:returns: A dict in the form {item_code: stock_qty}
+	"""
+	item_warehouses = {item_code: wh for item_code, wh in item_warehouses.items() if wh}
+	if not item_warehouses:
+		return {}
+
+	cache = frappe.cache()
+	keys = {
+		item_code: cache.make_key(get_stock_qty_cache_key(item_code, wh))
+		for item_code, wh in item_warehouses.items()
+	}
+	cached_values = redis().mget(list(keys.values()))
+
+	stock_qty_map, missing = {}, {}
+	for (item_code, wh), value in zip(item_warehouses.items(), cached_values):
+		if value is None:
+			missing[item_code] = wh
+		else:
+			stock_qty_map[item_code] = flt(value)
+
+	if missing:
+		computed = compute_stock_qty_map(missing)
+
+		pipeline = cache.pipeline(transaction=False)
+		for item_code in missing:
+			stock_qty_map[item_code] = computed.get(item_code, 0.0)
+			pipeline.set(keys[item_code], stock_qty_map[item_code], ex=STOCK_QTY_CACHE_TTL)
+		pipeline.execute()
+
+	return stock_qty_map
+
+
+def compute_stock_qty_map(item_warehouses):
+	"""Uncached `get_stock_qty_map`."""
+	warehouse_map = get_leaf_warehouses_map(set(item_warehouses.values()))
+	all_warehouses = {wh for warehouses in warehouse_map.values() for wh in warehouses}
+
+	bin_qty_map = get_bin_sales_uom_qty_map(list(item_warehouses), list(all_warehouses))
+	expired_batch_qty_map = get_expired_batch_qty_map(
+		{item_code for item_code, _warehouse in bin_qty_map}
+	)
+
+	stock_qty_map = {}
+	for item_code, warehouse in item_warehouses.items():
+		total_stock = 0.0
+		for wh in warehouse_map.get(warehouse, []):
+			if (item_code, wh) in bin_qty_map:
+				total_stock += max(
+					0, bin_qty_map[(item_code, wh)] - expired_batch_qty_map.get((item_code, wh), 0)
+				)
+
+		stock_qty_map[item_code] = total_stock
+
+	return stock_qty_map
+
+
+def get_stock_qty_cache_key(item_code, warehouse):
+	return f"{STOCK_QTY_CACHE_KEY}:{item_code}:{warehouse}"
+
+
+def clear_stock_qty_cache(doc, method=None):
+	"""
+	Invalidate cached stock qty of the item in the warehouse and its parent (group)
+	warehouses. Runs on Bin update and Stock Ledger Entry submission.
+
+	Only `actual_qty` is cached, so reservations do not matter. Bin quantities written
+	without document events (raw SQL, `db_set`, stock reposts) are not cleared here and
+	stay stale for up to `STOCK_QTY_CACHE_TTL` seconds.
+	"""
+	if not (doc.get("item_code") and doc.get("warehouse")):
+		return
+
+	warehouses = [doc.warehouse] + get_warehouse_tree().get_ancestors(doc.warehouse)
+	keys = [
+		frappe.cache().make_key(get_stock_qty_cache_key(doc.item_code, wh)) for wh in warehouses
+	]
+
+	run_now_and_after_commit(lambda: redis().delete(*keys))
+
+
+def get_bin_sales_uom_qty_map(item_codes, warehouses):
+	"""
+	Fetch actual qty (in sales UOM) of items across warehouses in one query.
+	:returns: A dict in the form {(item_code, warehouse): actual_qty}
+	"""
+	if not (item_codes and warehouses):
+		return {}
+
+	bin_data = frappe.db.sql(
+		"""
+		select S.item_code, S.warehouse, S.actual_qty / IFNULL(C.conversion_factor, 1)
+		from tabBin S
+		inner join `tabItem` I on S.item_code = I.Item_code
+		left join `tabUOM Conversion Detail` C on I.sales_uom = C.uom and C.parent = I.Item_code
+		where S.item_code in %(item_codes)s and S.warehouse in %(warehouses)s""",
+		{"item_codes": item_codes, "warehouses": warehouses},
+	)
+
+	return {(item_code, warehouse): flt(qty) for item_code, warehouse, qty in bin_data}
+
+
+def get_expired_batch_qty_map(item_codes):
+	"""
+	Qty in expired batches of items per warehouse, as precomputed by
+	`refresh_expired_batch_qty`. Computed on the fly until the day's refresh is done.
+	:returns: A dict in the form {(item_code, warehouse): expired qty}
+	"""
+	item_codes = list(item_codes)
+	if not item_codes:
+		return {}
+
+	cache = frappe.cache()
+	values = redis().hmget(
+		cache.make_key(EXPIRED_BATCH_QTY_KEY), [EXPIRED_BATCH_QTY_BUILT_ON] + item_codes
+	)
+	built_on = frappe.safe_decode(values[0]) if values[0] else None
+
+	if built_on == nowdate():
+		# items without expired stock are not stored
+		expired_qty_by_item = {
+			item_code: pickle.loads(value)
+			for item_code, value in zip(item_codes, values[1:])
+			if value is not None
+		}
 	else:
-		warehouses = [warehouse] if warehouse else []
-
-	total_stock = 0.0
-	if warehouses:
-		for warehouse in warehouses:
-			stock_qty = frappe.db.sql(
-				"""
-				select S.actual_qty / IFNULL(C.conversion_factor, 1)
-				from tabBin S
-				inner join `tabItem` I on S.item_code = I.Item_code
-				left join `tabUOM Conversion Detail` C on I.sales_uom = C.uom and C.parent = I.Item_code
-				where S.item_code=%s and S.warehouse=%s""",
-				(item_code, warehouse),
+		# batches could have expired since the last refresh
+		enqueue_refresh_expired_batch_qty()
+		expired_qty_by_item = compute_expired_batch_qty(item_codes)
+
+	return {
+		(item_code, warehouse): qty
+		for item_code, warehouse_qty in expired_qty_by_item.items()
+		for warehouse, qty in warehouse_qty.items()
+	}
+
+
+def compute_expired_batch_qty(item_codes=None):
+	"""
+	Qty in expired batches per item and warehouse. Expired batches with a balance are
+	fetched in one query, batch quantities (in all warehouses) with one call per batch.
+	:param item_codes: Items to compute for, all items if not set
+	:returns: A dict in the form {item_code: {warehouse: expired qty}}
+	"""
+	# consumed batches have nothing to subtract
+	filters = {"expiry_date": ["<=", nowdate()], "batch_qty": [">", 0]}
+	if item_codes is not None:
+		filters["item"] = ["in", list(item_codes)]
+
+	expired_batches = frappe.get_all("Batch", filters=filters, fields=["name", "item"])
+
+	expired_qty_by_item = {}
+	for batch in expired_batches:
+		for batch_info in get_batch_qty(batch.name):
+			if not flt(batch_info.qty):
+				continue
+
+			warehouse_qty = expired_qty_by_item.setdefault(batch.item, {})
+			warehouse_qty[batch_info.warehouse] = warehouse_qty.get(batch_info.warehouse, 0) + flt(
+				batch_info.qty
 			)
 
-			if stock_qty:
-				total_stock += adjust_qty_for_expired_items(item_code, stock_qty, warehouse)
+	return expired_qty_by_item
+
+
+def refresh_expired_batch_qty(item_codes=None):
+	"""
+	Precompute expired batch qty per item and warehouse into a redis hash.
+	Runs daily (batches expire at date rollover) for all items, and for an item on its
+	stock movements.
+	"""
+	cache = frappe.cache()
+	key = cache.make_key(EXPIRED_BATCH_QTY_KEY)
+	expired_qty_by_item = compute_expired_batch_qty(item_codes)
+
+	pipeline = cache.pipeline()
+	if item_codes is None:
+		pipeline.delete(key)
+		pipeline.hset(key, EXPIRED_BATCH_QTY_BUILT_ON, nowdate())
+		for item_code, warehouse_qty in expired_qty_by_item.items():
+			pipeline.hset(key, item_code, pickle.dumps(warehouse_qty))
+	else:
+		for item_code in item_codes:
+			if item_code in expired_qty_by_item:
+				pipeline.hset(key, item_code, pickle.dumps(expired_qty_by_item[item_code]))
+			else:
+				pipeline.hdel(key, item_code)
+	pipeline.execute()
+
 
-		in_stock = total_stock > 0 and 1 or 0
+def enqueue_refresh_expired_batch_qty():
+	"Enqueue the day's refresh once, readers compute on the fly until it is done."
+	cache = frappe.cache()
+	queued = redis().set(
+		cache.make_key(f"{EXPIRED_BATCH_QTY_KEY}_queued:{nowdate()}"), 1, nx=True, ex=86400
+	)
+	if not queued:
+		return
 
-	return frappe._dict(
-		{"in_stock": in_stock, "stock_qty": total_stock, "is_stock_item": is_stock_item}
+	frappe.enqueue(
+		"webshop.webshop.utils.product.refresh_expired_batch_qty",
+		queue="long",
+		job_id="refresh_expired_batch_qty",
+		deduplicate=True,
 	)
 
 
+def refresh_item_expired_batch_qty(doc, method=None):
+	"""
+	Refresh expired batch qty of the (batch managed) item after a stock movement or Batch
+	update. Items are collected per transaction and refreshed in one background job after
+	commit. Stock movements of items without expired batches are skipped.
+	"""
+	item_code = doc.get("item") if doc.doctype == "Batch" else doc.get("item_code")
+	if not (item_code and frappe.get_cached_value("Item", item_code, "has_batch_no")):
+		return
+
+	# {item_code: whether to refresh}
+	items = frappe.flags.expired_batch_qty_items
+	if items is None:
+		items = frappe.flags.expired_batch_qty_items = {}
+		frappe.db.after_commit.add(enqueue_refresh_items_expired_batch_qty)
+		frappe.db.after_rollback.add(reset_expired_batch_qty_items)
+
+	if doc.doctype == "Batch":
+		items[item_code] = True
+	elif item_code not in items:
+		items[item_code] = bool(
+			frappe.db.exists("Batch", {"item": item_code, "expiry_date": ["<=", nowdate()]})
+		)
+
+
+def enqueue_refresh_items_expired_batch_qty():
+	items = reset_expired_batch_qty_items() or {}
+	item_codes = sorted(item_code for item_code, refresh in items.items() if refresh)
+	if not item_codes:
+		return
+
+	frappe.enqueue(
+		"webshop.webshop.utils.product.refresh_expired_batch_qty",
+		queue="short",
+		item_codes=item_codes,
+	)
+
+
+def reset_expired_batch_qty_items():
+	item_codes = frappe.flags.expired_batch_qty_items
+	frappe.flags.expired_batch_qty_items = None
+	return item_codes
+
+
 def adjust_qty_for_expired_items(item_code, stock_qty, warehouse):
-	batches = frappe.get_all("Batch", filters=[{"item": item_code}], fields=["expiry_date", "name"])
-	expired_batches = get_expired_batches(batches)
 	stock_qty = [list(item) for item in stock_qty]
+	if not stock_qty:
+		return 0
 
-	for batch in expired_batches:
-		if warehouse:
-			stock_qty[0][0] = max(0, stock_qty[0][0] - get_batch_qty(batch, warehouse))
-		else:
-			stock_qty[0][0] = max(0, stock_qty[0][0] - qty_from_all_warehouses(get_batch_qty(batch)))
+	expired_qty_map = get_expired_batch_qty_map([item_code])
+	if warehouse:
+		expired_qty = expired_qty_map.get((item_code, warehouse), 0)
+	else:
+		expired_qty = sum(expired_qty_map.values())
+
+	return max(0, stock_qty[0][0] - expired_qty)
 
-		if not stock_qty[0][0]:
-			break
 
-	return stock_qty[0][0] if stock_qty else 0
+def get_non_stock_item_status(item_code, item_warehouse_field):
+	return get_non_stock_items_status([item_code], item_warehouse_field)[item_code]
 
 
-def get_expired_batches(batches):
+def get_non_stock_items_status(item_codes, item_warehouse_field, use_cache=False):
 	"""
-	:param batches: A list of dict in the form [{'expiry_date': datetime.date(20XX, 1, 1), 'name': 'batch_id'}, ...]
+	Availability of non stock items: a product bundle is available if all its bundle
+	items are in stock, other items are always available.
+	Bundle items of all bundles are read in one stock check per bundle warehouse.
+	:param use_cache: Read bundle items' stock from the short-lived stock qty cache
+	:returns: A dict in the form {item_code: 0/1}
 	"""
-	return [b.name for b in batches if b.expiry_date and b.expiry_date <= getdate(nowdate())]
+	bundle_items_map = get_product_bundle_items_map(item_codes)
+	bundles = [item_code for item_code in item_codes if bundle_items_map.get(item_code)]
+
+	status = {item_code: 1 for item_code in item_codes}
+	if not bundles:
+		return status
+
+	bundle_warehouses = dict(
+		frappe.get_all(
+			"Website Item",
+			filters={"item_code": ["in", bundles]},
+			fields=["item_code", item_warehouse_field],
+			as_list=True,
+		)
+	)
 
+	# {bundle warehouse: bundle items}
+	warehouse_items = {}
+	for bundle in bundles:
+		warehouse_items.setdefault(bundle_warehouses.get(bundle), set()).update(
+			bundle_items_map[bundle]
+		)
+
+	stock = {}
+	for warehouse, items in warehouse_items.items():
+		stock[warehouse] = get_web_items_qty_in_stock(
+			list(items), item_warehouse_field, warehouse, use_cache=use_cache
+		)
+
+	for bundle in bundles:
+		warehouse_stock = stock[bundle_warehouses.get(bundle)]
+		status[bundle] = all(
+			warehouse_stock[item_code].in_stock for item_code in bundle_items_map[bundle]
+		)
 
-def qty_from_all_warehouses(batch_info):
+	return status
+
+
+def get_product_bundle_items_map(item_codes):
 	"""
-	:param batch_info: A list of dict in the form [{u'warehouse': u'Stores - I', u'qty': 0.8}, ...]
+	Bundle items of product bundles, cached per bundle item code.
+	:returns: A dict in the form {item_code: [bundle item code, ...]} ([] if not a bundle)
 	"""
-	qty = 0
-	for batch in batch_info:
-		qty = qty + batch.qty
+	item_codes = list(dict.fromkeys(item_codes))
+	if not item_codes:
+		return {}
 
-	return qty
+	cache = frappe.cache()
+	key = cache.make_key(PRODUCT_BUNDLE_ITEMS_KEY)
+	values = redis().hmget(key, item_codes)
 
+	bundle_items_map = {
+		item_code: pickle.loads(value)
+		for item_code, value in zip(item_codes, values)
+		if value is not None
+	}
 
-def get_non_stock_item_status(item_code, item_warehouse_field):
-	# if item is a product bundle, check if its bundle items are in stock
-	if frappe.db.exists("Product Bundle", item_code):
-		items = frappe.get_doc("Product Bundle", item_code).get_all_children()
-		bundle_warehouse = frappe.db.get_value(
-			"Website Item", {"item_code": item_code}, item_warehouse_field
+	missing = [item_code for item_code in item_codes if item_code not in bundle_items_map]
+	if missing:
+		bundle_items = frappe.get_all(
+			"Product Bundle Item",
+			filters={"parent": ["in", missing], "parenttype": "Product Bundle"},
+			fields=["parent", "item_code"],
+			order_by="idx asc",
+		)
+
+		for item_code in missing:
+			bundle_items_map[item_code] = []
+		for row in bundle_items:
+			bundle_items_map[row.parent].append(row.item_code)
+
+		pipeline = cache.pipeline(transaction=False)
+		for item_code in missing:
+			pipeline.hset(key, item_code, pickle.dumps(bundle_items_map[item_code]))
+		pipeline.execute()
+
+	return bundle_items_map
+
+
+def clear_product_bundle_items(doc, method=None, old_name=None, new_name=None, merge=False):
+	"Invalidate cached bundle items of a Product Bundle (on update, rename and delete)."
+	item_codes = [
+		item_code for item_code in (doc.name, doc.get("new_item_code"), old_name) if item_code
+	]
+
+	def clear():
+		for item_code in item_codes:
+			frappe.cache().hdel(PRODUCT_BUNDLE_ITEMS_KEY, item_code)
+
+	run_now_and_after_commit(clear)
+
+
+def get_items_stock_availability(item_warehouses):
+	"""
+	Batched stock availability check for listings.
+	:param item_warehouses: A dict in the form {item_code: website_warehouse}
+	:returns: A dict in the form {item_code: True/False}
+	"""
+	stock_qty_map = get_stock_qty_map(item_warehouses)
+
+	return {item_code: bool(stock_qty_map.get(item_code)) for item_code in item_warehouses}
+
+
+def get_leaf_warehouses_map(warehouses):
+	"""
+	Expand group warehouses into their children.
+	:returns: A dict in the form {warehouse: [warehouse, child warehouse 1, ...]}
+	"""
+	tree = get_warehouse_tree()
+
+	warehouse_map = {}
+	for warehouse in warehouses:
+		if not warehouse:
+			continue
+
+		if tree.is_group(warehouse):
+			warehouse_map[warehouse] = tree.get_child_warehouses(warehouse)
+		else:
+			warehouse_map[warehouse] = [warehouse]
+
+	return warehouse_map
+
+
+def get_item_prices(item_codes, price_list, customer_group, company, qty=1, party=None):
+	"""
+	Prices of many items, as returned by `erpnext.utilities.product.get_price`.
+	Pricing Rules are applied by `get_price` itself, item by item. Without any enabled
+	selling Pricing Rule, Item Prices (with template fallback), UOM conversion factors
+	and currency details are fetched once for all items instead.
+	:returns: A dict in the form {item_code: price object}
+	"""
+	from erpnext.utilities.product import get_price
+
+	if not (item_codes and price_list):
+		return {}
+
+	if frappe.db.exists("Pricing Rule", {"disable": 0, "selling": 1}):
+		prices = {
+			item_code: get_price(item_code, price_list, customer_group, company, qty, party)
+			for item_code in item_codes
+		}
+		return {item_code: price for item_code, price in prices.items() if price}
+
+	template_map = dict(
+		frappe.get_all(
+			"Item",
+			filters={"name": ["in", item_codes], "variant_of": ["is", "set"]},
+			fields=["name", "variant_of"],
+			as_list=True,
 		)
-		return all(
-			get_web_item_qty_in_stock(d.item_code, item_warehouse_field, bundle_warehouse).in_stock
-			for d in items
+	)
+
+	price_map = {}
+	for row in frappe.get_all(
+		"Item Price",
+		fields=["item_code", "price_list_rate", "currency"],
+		filters={
+			"price_list": price_list,
+			"item_code": ["in", list(set(item_codes) | set(template_map.values()))],
+		},
+	):
+		# keep the first row per item, like `get_price`
+		price_map.setdefault(row.item_code, row)
+
+	uom_conversion_map = dict(
+		frappe.db.sql(
+			"""select I.name, C.conversion_factor
+			from `tabUOM Conversion Detail` C
+			inner join `tabItem` I on C.parent = I.name and C.uom = I.sales_uom
+			where I.name in %s""",
+			[item_codes],
 		)
-	else:
-		return 1
+	)
+
+	hide_currency_symbol = cint(frappe.db.get_default("hide_currency_symbol"))
+
+	prices = {}
+	for item_code in item_codes:
+		price = price_map.get(item_code) or price_map.get(template_map.get(item_code))
+		if not price:
+			continue
+
+		price_obj = frappe._dict(
+			price_list_rate=price.price_list_rate or 0, currency=price.currency or ""
+		)
+		price_obj.formatted_price = fmt_money(price_obj.price_list_rate, currency=price_obj.currency)
+		price_obj.currency_symbol = (
+			not hide_currency_symbol
+			and (
+				frappe.db.get_value("Currency", price_obj.currency, "symbol", cache=True)
+				or price_obj.currency
+			)
+			or ""
+		)
+
+		uom_conversion_factor = uom_conversion_map.get(item_code) or 1
+		price_obj.formatted_price_sales_uom = fmt_money(
+			price_obj.price_list_rate * uom_conversion_factor, currency=price_obj.currency
+		)
+
+		if not price_obj.formatted_price:
+			price_obj.formatted_price, price_obj.formatted_mrp = "", ""
+
+		prices[item_code] = price_obj
+
+	return prices
@@ -0,0 +1,89 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import unittest
+
+import frappe
+
+from erpnext.stock.doctype.item.test_item import make_item
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from webshop.webshop.doctype.website_item.test_website_item import create_regular_web_item
+from webshop.webshop.utils.product import (
+	get_non_stock_items_status,
+	get_web_items_qty_in_stock,
+)
+
+test_dependencies = ["Item", "Warehouse"]
+
+WAREHOUSE = "_Test Warehouse - _TC"
+
+
+class TestProductUtils(unittest.TestCase):
+	def setUp(self):
+		for item_code in ("Test Stocked Item", "Test Unstocked Item"):
+			create_regular_web_item(item_code, web_args={"website_warehouse": WAREHOUSE})
+
+		make_stock_entry(item_code="Test Stocked Item", target=WAREHOUSE, qty=2, rate=100)
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_web_items_qty_in_stock(self):
+		"Test if stock of many items is fetched at once from their website warehouses."
+		stock = get_web_items_qty_in_stock(
+			["Test Stocked Item", "Test Unstocked Item"], "website_warehouse"
+		)
+
+		self.assertEqual(stock["Test Stocked Item"].in_stock, 1)
+		self.assertEqual(stock["Test Stocked Item"].stock_qty, 2)
+		self.assertEqual(stock["Test Unstocked Item"].in_stock, 0)
+		self.assertEqual(stock["Test Unstocked Item"].stock_qty, 0)
+
+		# stock of a group warehouse includes its children
+		stock = get_web_items_qty_in_stock(
+			["Test Stocked Item"], "website_warehouse", "All Warehouses - _TC"
+		)
+		self.assertEqual(stock["Test Stocked Item"].stock_qty, 2)
+
+	def test_cached_stock_qty_after_stock_movement(self):
+		"Test if cached stock qty is cleared when stock moves in the warehouse."
+		stock = get_web_items_qty_in_stock(["Test Stocked Item"], "website_warehouse", use_cache=True)
+		self.assertEqual(stock["Test Stocked Item"].stock_qty, 2)
+
+		make_stock_entry(item_code="Test Stocked Item", source=WAREHOUSE, qty=2)
+
+		stock = get_web_items_qty_in_stock(["Test Stocked Item"], "website_warehouse", use_cache=True)
+		self.assertEqual(stock["Test Stocked Item"].in_stock, 0)
+
+	def test_product_bundle_status(self):
+		"Test if a bundle is available only if all its bundle items are in stock."
+		create_regular_web_item(
+			"Test Web Bundle",
+			item_args={"is_stock_item": 0},
+			web_args={"website_warehouse": WAREHOUSE},
+		)
+		make_item("Test Non Stock Web Item", {"is_stock_item": 0})
+
+		bundle = frappe.get_doc(
+			{
+				"doctype": "Product Bundle",
+				"new_item_code": "Test Web Bundle",
+				"items": [
+					{"item_code": "Test Stocked Item", "qty": 1},
+					{"item_code": "Test Unstocked Item", "qty": 1},
+				],
+			}
+		).insert()
+
+		status = get_non_stock_items_status(
+			["Test Web Bundle", "Test Non Stock Web Item"], "website_warehouse"
+		)
+		self.assertFalse(status["Test Web Bundle"])
+		self.assertTrue(status["Test Non Stock Web Item"])
+
+		# cached bundle items are cleared on bundle update
+		bundle.items = bundle.items[:1]
+		bundle.save()
+
+		status = get_non_stock_items_status(["Test Web Bundle"], "website_warehouse")
+		self.assertTrue(status["Test Web Bundle"])
@@ -0,0 +1,28 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+from webshop.webshop.utils.nested_set import NestedSetTree, clear_tree, get_tree
+
+
+class WarehouseTree(NestedSetTree):
+	"""Snapshot of the Warehouse tree to expand group warehouses without nested-set queries."""
+
+	doctype = "Warehouse"
+	parent_field = "parent_warehouse"
+	fields = ["is_group"]
+
+	def get_child_warehouses(self, warehouse):
+		"""Return `warehouse` and its descendants in lft order (like `get_child_warehouses`)."""
+		return self.get_descendants(warehouse, include_self=True)
+
+	def is_group(self, warehouse):
+		return bool(self.nodes.get(warehouse, {}).get("is_group"))
+
+
+def get_warehouse_tree():
+	"Return the process level Warehouse tree snapshot (see `get_tree`)."
+	return get_tree(WarehouseTree)
+
+
+def clear_warehouse_tree(doc=None, method=None, *args, **kwargs):
+	clear_tree("Warehouse")
@@ -1,60 +1,103 @@
+import pickle
+
 import frappe
+from frappe import _
+from frappe.utils import cint
+from redis.exceptions import LockError
 
+from webshop.webshop.utils.cache import make_key, redis, run_now_and_after_commit
 
-class ItemVariantsCacheManager:
-	def __init__(self, item_code):
-		self.item_code = item_code
+ITEM_VARIANTS_CACHE_KEY = "item_variants_cache"
+# {template: token}, set while the cached value is outdated
+ITEM_VARIANTS_STALE_KEY = "item_variants_cache_stale"
 
-	def get_item_variants_data(self):
-		val = frappe.cache().hget("item_variants_data", self.item_code)
+# {attribute: ordered attribute values}
+ITEM_ATTRIBUTE_VALUES_KEY = "item_attribute_values"
 
-		if not val:
-			self.build_cache()
+# seconds after which the lock of a dead build expires
+BUILD_LOCK_TIMEOUT = 300
+# seconds to wait for a build by another process
+BUILD_WAIT_TIMEOUT = 30
 
-		return frappe.cache().hget("item_variants_data", self.item_code)
 
-	def get_attribute_value_item_map(self):
-		val = frappe.cache().hget("attribute_value_item_map", self.item_code)
+class ItemVariantsCacheManager:
+	"""Variant data of a template Item, cached in redis as one value per template
+	(fetched with a single round trip) and memoised for the request.
 
-		if not val:
-			self.build_cache()
+	Only one process builds the cache at a time (guarded by a redis lock). Structural
+	changes drop the cache, other changes only mark it stale: the stale value keeps
+	being served while it is rebuilt in the background.
+	"""
 
-		return frappe.cache().hget("attribute_value_item_map", self.item_code)
+	def __init__(self, item_code):
+		self.item_code = item_code
 
 	def get_item_attribute_value_map(self):
-		val = frappe.cache().hget("item_attribute_value_map", self.item_code)
-
-		if not val:
-			self.build_cache()
-
-		return frappe.cache().hget("item_attribute_value_map", self.item_code)
+		return self.get_cache()["item_attribute_value_map"]
 
 	def get_optional_attributes(self):
-		val = frappe.cache().hget("optional_attributes", self.item_code)
+		return self.get_cache()["optional_attributes"]
+
+	def get_variant_index(self):
+		"""Bitsets over variant ordinals, see `build_variant_index`."""
+		return self.get_cache()["variant_index"]
+
+	def get_cache(self):
+		memo = get_request_memo()
+		if self.item_code in memo:
+			return memo[self.item_code]
+
+		cache, stale = self.get_cached_value()
+		if cache is None:
+			cache = self.build_cache_once()
+		elif stale:
+			# serve the stale value, rebuild in the background
+			enqueue_build_cache(self.item_code)
+
+		memo[self.item_code] = cache
+		return cache
+
+	def get_cached_value(self):
+		"Return the cached value and whether it is stale, in one round trip."
+		pipeline = frappe.cache().pipeline()
+		pipeline.hget(make_key(ITEM_VARIANTS_CACHE_KEY), self.item_code)
+		pipeline.hexists(make_key(ITEM_VARIANTS_STALE_KEY), self.item_code)
+		cache, stale = pipeline.execute()
+
+		return (pickle.loads(cache) if cache is not None else None), stale
+
+	def build_cache_once(self):
+		"""Build the cache holding the build lock. Readers arriving meanwhile wait for the
+		lock and use the value built by its holder."""
+		lock = get_build_lock(self.item_code)
+		if not lock.acquire(blocking_timeout=BUILD_WAIT_TIMEOUT):
+			frappe.throw(
+				_("Product variants are being updated, please try again shortly."),
+				exc=frappe.TooManyRequestsError,
+			)
 
-		if not val:
-			self.build_cache()
+		try:
+			cache, stale = self.get_cached_value()
+			if cache is not None:
+				return cache
 
-		return frappe.cache().hget("optional_attributes", self.item_code)
+			return self.build_cache()
+		finally:
+			release_build_lock(lock)
 
-	def get_ordered_attribute_values(self):
-		val = frappe.cache().get_value("ordered_attribute_values_map")
-		if val:
-			return val
+	def get_ordered_attribute_values(self, attributes=None):
+		"""Return {attribute: values in Item Attribute order} for `attributes`
+		(defaults to the attributes of the variants)."""
+		if attributes is None:
+			attributes = list(self.get_variant_index()["attribute_values"])
 
-		all_attribute_values = frappe.get_all(
-			"Item Attribute Value", ["attribute_value", "idx", "parent"], order_by="idx asc"
+		return frappe._dict(
+			{attribute: get_item_attribute_values(attribute).values for attribute in attributes}
 		)
 
-		ordered_attribute_values_map = frappe._dict({})
-		for d in all_attribute_values:
-			ordered_attribute_values_map.setdefault(d.parent, []).append(d.attribute_value)
-
-		frappe.cache().set_value("ordered_attribute_values_map", ordered_attribute_values_map)
-		return ordered_attribute_values_map
-
 	def build_cache(self):
 		parent_item_code = self.item_code
+		stale_token = get_stale_token(parent_item_code)
 
 		attributes = [
 			a.attribute
@@ -76,13 +119,10 @@ class ItemVariantsCacheManager:
 		)
 		item_variants_data = query.run()
 
-		attribute_value_item_map = frappe._dict()
 		item_attribute_value_map = frappe._dict()
 
 		for row in item_variants_data:
 			item_code, attribute, attribute_value = row
-			# (attr, value) => [item1, item2]
-			attribute_value_item_map.setdefault((attribute, attribute_value), []).append(item_code)
 			# item => {attr1: value1, attr2: value2}
 			item_attribute_value_map.setdefault(item_code, {})[attribute] = attribute_value
 
@@ -92,39 +132,159 @@ class ItemVariantsCacheManager:
 				if attribute not in attr_dict:
 					optional_attributes.add(attribute)
 
-		frappe.cache().hset("attribute_value_item_map", parent_item_code, attribute_value_item_map)
-		frappe.cache().hset("item_attribute_value_map", parent_item_code, item_attribute_value_map)
-		frappe.cache().hset("item_variants_data", parent_item_code, item_variants_data)
-		frappe.cache().hset("optional_attributes", parent_item_code, optional_attributes)
+		cache = {
+			"item_attribute_value_map": item_attribute_value_map,
+			"optional_attributes": optional_attributes,
+			"variant_index": build_variant_index(item_variants_data),
+		}
+		frappe.cache().hset(ITEM_VARIANTS_CACHE_KEY, parent_item_code, cache)
+		get_request_memo()[parent_item_code] = cache
 
-	def clear_cache(self):
-		keys = [
-			"attribute_value_item_map",
-			"item_attribute_value_map",
-			"item_variants_data",
-			"optional_attributes",
-		]
+		# stays stale if it was invalidated again during the build
+		if stale_token and get_stale_token(parent_item_code) == stale_token:
+			redis().hdel(make_key(ITEM_VARIANTS_STALE_KEY), parent_item_code)
+
+		return cache
 
-		for key in keys:
-			frappe.cache().hdel(key, self.item_code)
+	def clear_cache(self):
+		frappe.cache().hdel(ITEM_VARIANTS_CACHE_KEY, self.item_code)
+		redis().hdel(make_key(ITEM_VARIANTS_STALE_KEY), self.item_code)
+		get_request_memo().pop(self.item_code, None)
 
 	def rebuild_cache(self):
-		self.clear_cache()
+		"""Drop the cache on structural changes (variants or attributes changed),
+		the next reader rebuilds it from the current data."""
+		run_now_and_after_commit(self.clear_cache)
+
+	def mark_stale(self):
+		"Mark the cache stale and rebuild it in the background, it is served meanwhile."
+		redis().hset(make_key(ITEM_VARIANTS_STALE_KEY), self.item_code, frappe.generate_hash(length=10))
+		get_request_memo().pop(self.item_code, None)
 		enqueue_build_cache(self.item_code)
 
 
+def build_variant_index(item_variants_data):
+	"""Index variants as bitsets, bit `n` standing for the variant at `variants[n]`.
+
+	Returns:
+	        dict: {
+	                "variants": [item_code, ...],
+	                "value_masks": {(attribute, value): bitset of variants with the value},
+	                "attribute_masks": {attribute: bitset of variants having the attribute},
+	                "attribute_values": {attribute: [value, ...]},
+	        }
+	"""
+	ordinals = {}
+	value_masks = {}
+	attribute_masks = {}
+	attribute_values = {}
+
+	for item_code, attribute, attribute_value in item_variants_data:
+		bit = 1 << ordinals.setdefault(item_code, len(ordinals))
+
+		if (attribute, attribute_value) not in value_masks:
+			value_masks[(attribute, attribute_value)] = 0
+			attribute_values.setdefault(attribute, []).append(attribute_value)
+
+		value_masks[(attribute, attribute_value)] |= bit
+		attribute_masks[attribute] = attribute_masks.get(attribute, 0) | bit
+
+	return {
+		"variants": list(ordinals),
+		"value_masks": value_masks,
+		"attribute_masks": attribute_masks,
+		"attribute_values": attribute_values,
+	}
+
+
+def get_variants_in_mask(variant_index, mask):
+	"Return item codes of the variants set in bitset `mask`, in ordinal order."
+	variants = variant_index["variants"]
+	item_codes = []
+
+	while mask:
+		lowest_bit = mask & -mask
+		item_codes.append(variants[lowest_bit.bit_length() - 1])
+		mask ^= lowest_bit
+
+	return item_codes
+
+
+def get_item_attribute_values(attribute):
+	"""Return the cached ordering of an Item Attribute's values.
+
+	Returns:
+	        dict: {"numeric_values": 0/1, "values": [attribute_value, ...] in idx order}
+	"""
+	return frappe.cache().hget(
+		ITEM_ATTRIBUTE_VALUES_KEY, attribute, generator=lambda: build_item_attribute_values(attribute)
+	)
+
+
+def build_item_attribute_values(attribute):
+	return frappe._dict(
+		numeric_values=cint(frappe.db.get_value("Item Attribute", attribute, "numeric_values")),
+		values=frappe.get_all(
+			"Item Attribute Value",
+			filters={"parent": attribute},
+			order_by="idx asc",
+			pluck="attribute_value",
+		),
+	)
+
+
+def clear_item_attribute_values(doc, method=None, old_name=None, new_name=None, merge=False):
+	"Invalidate the cached values of an Item Attribute (on update, rename and delete)."
+	for attribute in [doc.name, old_name]:
+		if attribute:
+			frappe.cache().hdel(ITEM_ATTRIBUTE_VALUES_KEY, attribute)
+
+
+def get_request_memo():
+	if getattr(frappe.local, "item_variants_cache", None) is None:
+		frappe.local.item_variants_cache = {}
+
+	return frappe.local.item_variants_cache
+
+
+def get_stale_token(item_code):
+	return redis().hget(make_key(ITEM_VARIANTS_STALE_KEY), item_code)
+
+
+def get_build_lock(item_code):
+	return frappe.cache().lock(
+		make_key(f"item_variants_cache_build:{item_code}"), timeout=BUILD_LOCK_TIMEOUT
+	)
+
+
+def release_build_lock(lock):
+	try:
+		lock.release()
+	except LockError:
+		# expired, build took longer than the timeout
+		pass
+
+
 def build_cache(item_code):
-	frappe.cache().hset("item_cache_build_in_progress", item_code, 1)
-	i = ItemVariantsCacheManager(item_code)
-	i.build_cache()
-	frappe.cache().hset("item_cache_build_in_progress", item_code, 0)
+	lock = get_build_lock(item_code)
+	if not lock.acquire(blocking=False):
+		# being built by another process
+		return
+
+	try:
+		ItemVariantsCacheManager(item_code).build_cache()
+	finally:
+		release_build_lock(lock)
 
 
 def enqueue_build_cache(item_code):
-	if frappe.cache().hget("item_cache_build_in_progress", item_code):
+	if get_build_lock(item_code).locked():
 		return
+
 	frappe.enqueue(
 		"webshop.webshop.variant_selector.item_variants_cache.build_cache",
 		item_code=item_code,
 		queue="long",
+		job_id=f"build_item_variants_cache::{item_code}",
+		deduplicate=True,
 	)
@@ -1,3 +1,5 @@
+import unittest
+
 import frappe
 from frappe.tests.utils import FrappeTestCase
 
@@ -6,7 +8,19 @@ from webshop.webshop.doctype.webshop_settings.test_webshop_settings import (
 	setup_webshop_settings,
 )
 from webshop.webshop.doctype.website_item.website_item import make_website_item
-from webshop.webshop.variant_selector.utils import get_next_attribute_and_values
+from webshop.webshop.variant_selector.item_variants_cache import (
+	ITEM_VARIANTS_CACHE_KEY,
+	ItemVariantsCacheManager,
+	build_variant_index,
+	get_item_attribute_values,
+	get_variants_in_mask,
+)
+from webshop.webshop.variant_selector.utils import (
+	get_exact_match_mask,
+	get_next_attribute_and_values,
+	get_selected_attributes_mask,
+	get_values_in_mask,
+)
 from erpnext.stock.doctype.item.test_item import make_item
 
 test_dependencies = ["Item"]
@@ -73,6 +87,39 @@ class TestVariantSelector(FrappeTestCase):
 		small_variant.disabled = 0
 		small_variant.save()
 
+	def test_variant_cache(self):
+		"Test if a template's variant data is cached as one value and rebuilt once cleared."
+		item_cache = ItemVariantsCacheManager("Test-Tshirt-Temp")
+		item_cache.clear_cache()
+
+		variant_index = item_cache.get_variant_index()
+		self.assertEqual(len(variant_index["variants"]), 5)
+		self.assertIsNotNone(frappe.cache().hget(ITEM_VARIANTS_CACHE_KEY, "Test-Tshirt-Temp"))
+
+		# served from the request memo without reading redis again
+		frappe.cache().hdel(ITEM_VARIANTS_CACHE_KEY, "Test-Tshirt-Temp")
+		self.assertIs(item_cache.get_variant_index(), variant_index)
+
+		item_cache.clear_cache()
+		self.assertEqual(len(item_cache.get_variant_index()["variants"]), 5)
+		self.assertIsNotNone(frappe.cache().hget(ITEM_VARIANTS_CACHE_KEY, "Test-Tshirt-Temp"))
+
+	def test_item_attribute_values_cache(self):
+		"Test if cached Item Attribute values keep their order and follow attribute updates."
+		values = get_item_attribute_values("Test Size").values
+		self.assertLess(values.index("Small"), values.index("Large"))
+
+		attribute = frappe.get_doc("Item Attribute", "Test Size")
+		attribute.append("item_attribute_values", {"attribute_value": "Test Huge", "abbr": "THG"})
+		attribute.save()
+
+		self.assertEqual(get_item_attribute_values("Test Size").values[-1], "Test Huge")
+
+		# teardown
+		attribute.item_attribute_values = attribute.item_attribute_values[:-1]
+		attribute.save()
+		self.assertNotIn("Test Huge", get_item_attribute_values("Test Size").values)
+
 	def test_next_item_variant_values(self):
 		"""
 		Test if on selecting an attribute value, the next possible values
@@ -123,3 +170,72 @@ class TestVariantSelector(FrappeTestCase):
 		self.assertEqual(next_values["exact_match"][0], "Test-Tshirt-Temp-S-R")
 		self.assertEqual(price_info["price_list_rate"], 100.0)
 		self.assertEqual(price_info["formatted_price_sales_uom"], "₹ 100.00")
+
+
+class TestVariantIndex(unittest.TestCase):
+	def setUp(self):
+		# Small-Plain has no colour
+		self.variant_index = build_variant_index(
+			[
+				("Tshirt-L-R", "Size", "Large"),
+				("Tshirt-L-R", "Colour", "Red"),
+				("Tshirt-L-G", "Size", "Large"),
+				("Tshirt-L-G", "Colour", "Green"),
+				("Tshirt-S-R", "Size", "Small"),
+				("Tshirt-S-R", "Colour", "Red"),
+				("Tshirt-S-Plain", "Size", "Small"),
+			]
+		)
+
+	def get_variants(self, selected_attributes):
+		mask = get_selected_attributes_mask(self.variant_index, selected_attributes)
+		return get_variants_in_mask(self.variant_index, mask)
+
+	def test_variant_index(self):
+		"Test if variants get an ordinal each and values a bitset of their variants."
+		index = self.variant_index
+
+		self.assertEqual(index["variants"], ["Tshirt-L-R", "Tshirt-L-G", "Tshirt-S-R", "Tshirt-S-Plain"])
+		self.assertEqual(index["value_masks"][("Size", "Small")], 0b1100)
+		self.assertEqual(index["value_masks"][("Colour", "Red")], 0b0101)
+		self.assertEqual(index["attribute_masks"]["Colour"], 0b0111)
+		self.assertEqual(
+			index["attribute_values"], {"Size": ["Large", "Small"], "Colour": ["Red", "Green"]}
+		)
+
+		self.assertEqual(get_variants_in_mask(index, 0b1010), ["Tshirt-L-G", "Tshirt-S-Plain"])
+		self.assertEqual(get_variants_in_mask(index, 0), [])
+
+	def test_selected_attributes(self):
+		"Test if variants and next values are filtered by all selected values."
+		self.assertEqual(len(self.get_variants({})), 4)
+		self.assertEqual(self.get_variants({"Colour": "Red"}), ["Tshirt-L-R", "Tshirt-S-R"])
+		self.assertEqual(self.get_variants({"Size": "Small", "Colour": "Green"}), [])
+		self.assertEqual(self.get_variants({"Size": "Medium"}), [])
+
+		mask = get_selected_attributes_mask(self.variant_index, {"Size": "Small"})
+		self.assertEqual(get_values_in_mask(self.variant_index, "Colour", mask), ["Red"])
+
+		mask = get_selected_attributes_mask(self.variant_index, {"Colour": "Green"})
+		self.assertEqual(get_values_in_mask(self.variant_index, "Size", mask), ["Large"])
+
+	def test_exact_match(self):
+		"Test if only variants with exactly the selected attributes match."
+		index = self.variant_index
+
+		selected = {"Size": "Small"}
+		mask = get_selected_attributes_mask(index, selected)
+		# Small-Red has a colour too
+		self.assertEqual(
+			get_variants_in_mask(index, get_exact_match_mask(index, mask, selected)), ["Tshirt-S-Plain"]
+		)
+
+		selected = {"Size": "Small", "Colour": "Red"}
+		mask = get_selected_attributes_mask(index, selected)
+		self.assertEqual(
+			get_variants_in_mask(index, get_exact_match_mask(index, mask, selected)), ["Tshirt-S-R"]
+		)
+
+		selected = {"Size": "Large"}
+		mask = get_selected_attributes_mask(index, selected)
+		self.assertEqual(get_exact_match_mask(index, mask, selected), 0)
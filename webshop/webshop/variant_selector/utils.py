@@ -5,7 +5,12 @@ from webshop.webshop.doctype.webshop_settings.webshop_settings import (
 	get_shopping_cart_settings,
 )
 from webshop.webshop.shopping_cart.cart import _set_price_list
-from webshop.webshop.variant_selector.item_variants_cache import ItemVariantsCacheManager
+from webshop.webshop.utils.product import get_stock_qty_map
+from webshop.webshop.variant_selector.item_variants_cache import (
+	ItemVariantsCacheManager,
+	get_item_attribute_values,
+	get_variants_in_mask,
+)
 from erpnext.utilities.product import get_price
 
 
@@ -76,36 +81,32 @@ def get_attributes_and_values(item_code):
 	This will ignore the values upon selection of which there cannot exist one item.
 	"""
 	item_cache = ItemVariantsCacheManager(item_code)
-	item_variants_data = item_cache.get_item_variants_data()
+	attribute_values = item_cache.get_variant_index()["attribute_values"]
 
 	attributes = get_item_attributes(item_code)
-	attribute_list = [a.attribute for a in attributes]
-
-	valid_options = {}
-	for item_code, attribute, attribute_value in item_variants_data:
-		if attribute in attribute_list:
-			valid_options.setdefault(attribute, set()).add(attribute_value)
 
-	item_attribute_values = frappe.db.get_all(
-		"Item Attribute Value", ["parent", "attribute_value", "idx"], order_by="parent asc, idx asc"
-	)
-	ordered_attribute_value_map = frappe._dict()
-	for iv in item_attribute_values:
-		ordered_attribute_value_map.setdefault(iv.parent, []).append(iv.attribute_value)
+	# values that at least one variant has
+	valid_options = {
+		attr.attribute: set(attribute_values.get(attr.attribute, [])) for attr in attributes
+	}
 
 	# build attribute values in idx order
 	for attr in attributes:
 		valid_attribute_values = valid_options.get(attr.attribute, [])
-		ordered_values = ordered_attribute_value_map.get(attr.attribute, [])
-		attr["values"] = [v for v in ordered_values if v in valid_attribute_values]
+		item_attribute_values = get_item_attribute_values(attr.attribute)
+
+		if item_attribute_values.numeric_values:
+			attr["values"] = sorted(valid_attribute_values, key=flt)
+		else:
+			attr["values"] = [
+				v for v in item_attribute_values.values if v in valid_attribute_values
+			]
 
 	return attributes
 
 
 @frappe.whitelist(allow_guest=True)
 def get_next_attribute_and_values(item_code, selected_attributes):
-	from erpnext.stock.doctype.warehouse.warehouse import get_child_warehouses
-
 	"""Find the count of Items that match the selected attributes.
 	Also, find the attribute values that are not applicable for further searching.
 	If less than equal to 10 items are found, return item_codes of those items.
@@ -114,11 +115,12 @@ def get_next_attribute_and_values(item_code, selected_attributes):
 	selected_attributes = frappe.parse_json(selected_attributes)
 
 	item_cache = ItemVariantsCacheManager(item_code)
-	item_variants_data = item_cache.get_item_variants_data()
+	variant_index = item_cache.get_variant_index()
 
 	attributes = get_item_attributes(item_code)
 	attribute_list = [a.attribute for a in attributes]
-	filtered_items = get_items_with_selected_attributes(item_code, selected_attributes)
+	filtered_mask = get_selected_attributes_mask(variant_index, selected_attributes)
+	filtered_items = get_variants_in_mask(variant_index, filtered_mask)
 
 	next_attribute = None
 
@@ -137,23 +139,21 @@ def get_next_attribute_and_values(item_code, selected_attributes):
 			# already selected attribute values are valid options
 			valid_options_for_attributes[a].add(selected_attribute)
 
-	for row in item_variants_data:
-		item_code, attribute, attribute_value = row
-		if (
-			item_code in filtered_items
-			and attribute not in selected_attributes
-			and attribute in attribute_list
-		):
-			valid_options_for_attributes[attribute].add(attribute_value)
+	# values of unselected attributes that some of the filtered items have
+	for attribute in attribute_list:
+		if attribute in selected_attributes:
+			continue
+
+		valid_options_for_attributes[attribute].update(
+			get_values_in_mask(variant_index, attribute, filtered_mask)
+		)
 
 	optional_attributes = item_cache.get_optional_attributes()
 	exact_match = []
 	# search for exact match if all selected attributes are required attributes
 	if len(selected_attributes.keys()) >= (len(attribute_list) - len(optional_attributes)):
-		item_attribute_value_map = item_cache.get_item_attribute_value_map()
-		for item_code, attr_dict in item_attribute_value_map.items():
-			if item_code in filtered_items and set(attr_dict.keys()) == set(selected_attributes.keys()):
-				exact_match.append(item_code)
+		exact_mask = get_exact_match_mask(variant_index, filtered_mask, selected_attributes)
+		exact_match = get_variants_in_mask(variant_index, exact_mask)
 
 	filtered_items_count = len(filtered_items)
 
@@ -181,15 +181,8 @@ def get_next_attribute_and_values(item_code, selected_attributes):
 		)
 
 	available_qty = 0.0
-	if warehouse and frappe.get_cached_value("Warehouse", warehouse, "is_group") == 1:
-		warehouses = get_child_warehouses(warehouse)
-	else:
-		warehouses = [warehouse] if warehouse else []
-
-	for warehouse in warehouses:
-		available_qty += flt(
-			frappe.db.get_value("Bin", {"item_code": product_id, "warehouse": warehouse}, "actual_qty")
-		)
+	if warehouse:
+		available_qty = get_stock_qty_map({product_id: warehouse}).get(product_id, 0.0)
 
 	return {
 		"next_attribute": next_attribute,
@@ -202,16 +195,34 @@ def get_next_attribute_and_values(item_code, selected_attributes):
 	}
 
 
-def get_items_with_selected_attributes(item_code, selected_attributes):
-	item_cache = ItemVariantsCacheManager(item_code)
-	attribute_value_item_map = item_cache.get_attribute_value_item_map()
+def get_selected_attributes_mask(variant_index, selected_attributes):
+	"Return the bitset of variants having all selected attribute values."
+	mask = (1 << len(variant_index["variants"])) - 1
 
-	items = []
 	for attribute, value in selected_attributes.items():
-		filtered_items = attribute_value_item_map.get((attribute, value), [])
-		items.append(set(filtered_items))
+		mask &= variant_index["value_masks"].get((attribute, value), 0)
+
+	return mask
+
+
+def get_exact_match_mask(variant_index, mask, selected_attributes):
+	"Return the variants in `mask` having the selected attributes and no other attribute."
+	for attribute, attribute_mask in variant_index["attribute_masks"].items():
+		if attribute in selected_attributes:
+			mask &= attribute_mask
+		else:
+			mask &= ~attribute_mask
+
+	return mask
+
 
-	return set.intersection(*items)
+def get_values_in_mask(variant_index, attribute, mask):
+	"Return the values of `attribute` that at least one variant in `mask` has."
+	return [
+		attribute_value
+		for attribute_value in variant_index["attribute_values"].get(attribute, [])
+		if variant_index["value_masks"][(attribute, attribute_value)] & mask
+	]
 
 
 # utilities
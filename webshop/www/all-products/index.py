@@ -1,7 +1,7 @@
 import frappe
 from frappe.utils import cint
 
-from webshop.webshop.product_data_engine.filters import ProductFiltersBuilder
+from webshop.webshop.product_data_engine.filters import get_product_filters
 
 sitemap = 1
 
@@ -11,9 +11,7 @@ def get_context(context):
 	context.body_class = "product-page"
 	context.parents = [{"name": frappe._("Home"), "route": "/"}]
 
-	filter_engine = ProductFiltersBuilder()
-	context.field_filters = filter_engine.get_field_filters()
-	context.attribute_filters = filter_engine.get_attribute_filters()
+	context.field_filters, context.attribute_filters = get_product_filters()
 
 	context.page_length = (
 		cint(frappe.db.get_single_value("Webshop Settings", "products_per_page")) or 20